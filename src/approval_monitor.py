@@ -11,33 +11,40 @@ import zoneinfo
 
 from config import load_config
 from fyers_client import get_fyers
-from indicators import to_ohlcv_df, opening_range, atr, vwap, rsi
-from sim_costs import apply_slippage
+from indicators import to_ohlcv_df
+from sim_costs import apply_slippage, slippage_model_from_config
 from data_cache import get_intraday
 from universe import load_universe
 from pending_approval import PendingApproval, save_pending
 from regime import classify_regime
+from grades import grade_from_score, grade_rank
+from sectors import load_sector_map
 from speed_filters import prefilter_symbols
 from pathlib import Path
 from trading_days import is_trading_day, is_market_open
 from stocks_in_play import get_stocks_in_play
+from streaming_indicators import catch_up, load_intraday_states, save_intraday_states
+from panel import load_panel
+from ranking import select_top_symbols
+from volume_profile import load_profile
+from mean_reversion import bar_slip_bps, set_anchored_vwap
+from orb_engine import NiftyContext, ORBParams, SessionArrays, ist_str, latest_orb_signal, orb_score
 
 IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 BASE = Path(__file__).resolve().parents[1]
 STATE_PATH = BASE / "data" / "last_approval.json"
 RISK_STATE_PATH = BASE / "data" / "risk_state.json"
 APPROVAL_LOG_PATH = BASE / "data" / "approval_log.jsonl"
-SECTOR_MAP_PATH = BASE / "data" / "sector_map.json"
 
 
-def fetch_intraday(symbol: str, d: str) -> pd.DataFrame:
+def fetch_intraday(symbol: str, d: str, resolution: str = "5") -> pd.DataFrame:
     fyers = get_fyers()
 
     def _fetch():
         resp = fyers.history(
             {
                 "symbol": symbol,
-                "resolution": "5",
+                "resolution": resolution,
                 "date_format": "1",
                 "range_from": d,
                 "range_to": d,
@@ -48,7 +55,7 @@ def fetch_intraday(symbol: str, d: str) -> pd.DataFrame:
             return []
         return resp.get("candles") or []
 
-    return get_intraday(symbol, d, "5", _fetch)
+    return get_intraday(symbol, d, resolution, _fetch)
 
 
 def load_state() -> dict:
@@ -94,15 +101,6 @@ def append_approval_log(cand: dict, decision: str = "sent") -> None:
         f.write(json.dumps(row) + "\n")
 
 
-def load_sector_map() -> dict:
-    if SECTOR_MAP_PATH.exists():
-        try:
-            return json.loads(SECTOR_MAP_PATH.read_text())
-        except Exception:
-            return {}
-    return {}
-
-
 def sector_count_today(sector: str, d: str) -> int:
     if not APPROVAL_LOG_PATH.exists():
         return 0
@@ -149,21 +147,6 @@ def get_today_pnl_losses_trades(d: str) -> tuple[float, int, int]:
         return 0.0, 0, 0
 
 
-def grade_from_score(score: float, thresholds: dict) -> str:
-    aplus = float(thresholds.get("Aplus", 2.0))
-    a = float(thresholds.get("A", 1.2))
-    if score >= aplus:
-        return "A+"
-    if score >= a:
-        return "A"
-    return "B"
-
-
-def grade_rank(g: str) -> int:
-    order = {"B": 0, "A": 1, "A+": 2}
-    return order.get(str(g).upper().strip(), 0)
-
-
 def find_best_signal(now_ist: datetime) -> Optional[dict]:
     cfg = load_config()
     orb = cfg["strategies"]["ORB"]
@@ -180,14 +163,14 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
     max_or_atr = float(orb.get("maxORtoATR", 0.0))
     r_inr_base = float(risk.get("rPerTradeInr", 125))
     slip_bps = float(sim.get("slippageBpsEachSide", 10))
+    slippage = slippage_model_from_config(sim)
     fixed_cost = float(sim.get("roundTripFixedCostInr", 2.0))
 
+    vwap_anchor = str(mr.get("vwapAnchor", ""))
+    vwap_band_std = float(mr.get("vwapBandStd", 0.0))
+
     nifty_symbol = str(flt.get("niftySymbol", "NSE:NIFTY50-INDEX"))
     require_nifty_vwap = bool(flt.get("requireNiftyVwap", False))
-    nifty_df = fetch_intraday(nifty_symbol, d) if require_nifty_vwap else None
-    if require_nifty_vwap and nifty_df is not None and not nifty_df.empty:
-        nifty_df = nifty_df.copy()
-        nifty_df["vwap"] = vwap(nifty_df)
 
     grade_thresholds = cfg.get("telegram", {}).get("gradeThresholds", {"Aplus": 2.0, "A": 1.2})
     vol_clamp = cfg.get("volatilityClamp", {"maxAtrPct": 4.0})
@@ -195,6 +178,7 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
     sector_map = load_sector_map()
 
     d = now_ist.strftime("%Y-%m-%d")
+    nifty = NiftyContext.from_df(fetch_intraday(nifty_symbol, d), strict=True) if require_nifty_vwap else None
 
     # Regime classification decides ORB vs MR
     reg = classify_regime(
@@ -212,11 +196,20 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
 
     best = None
 
-    # Opening range timestamps
-    or_start_ist = datetime.strptime(d + " 09:15", "%Y-%m-%d %H:%M").replace(tzinfo=IST)
-    or_end_ist = datetime.strptime(d + " 09:30", "%Y-%m-%d %H:%M").replace(tzinfo=IST)
-    or_start_utc = pd.Timestamp(or_start_ist.astimezone(timezone.utc))
-    or_end_utc = pd.Timestamp(or_end_ist.astimezone(timezone.utc))
+    orb_params = ORBParams(
+        vol_mult=vol_mult,
+        tgt_r=tgt_r,
+        stop_atr_mult=float(orb.get("stopAtrMult", 0.5)),
+        min_bars=20,
+        min_or_range_pct=min_or_pct,
+        max_or_range_pct=max_or_pct,
+        min_or_atr_ratio=min_or_atr,
+        max_or_atr_ratio=max_or_atr,
+        r_inr=r_inr,
+        slippage_bps=slip_bps,
+        slippage=slippage,
+        fixed_cost_inr=fixed_cost,
+    )
 
     universe = prefilter_symbols(load_universe())
     sip_cfg = flt.get("stocksInPlay", {})
@@ -228,156 +221,84 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
             min_rvol=float(sip_cfg.get("minRvol", 1.5)),
             top_n=int(sip_cfg.get("topN", 20)),
         )
+    rank_cfg = flt.get("crossSectionalRank", {})
+    if bool(rank_cfg.get("enabled", False)):
+        # Keep only the strongest symbols right now (RVOL, breakout, ATR%, momentum)
+        pan = load_panel(universe, now_ist.date(), lambda sym, _d: fetch_intraday(sym, d))
+        universe = select_top_symbols(
+            pan,
+            int(rank_cfg.get("topK", 15)),
+            at_epoch=int(now_ist.timestamp()),
+            profile=load_profile(),
+            weights=rank_cfg.get("weights"),
+            or_start=orb.get("openingRange", {}).get("start", "09:15"),
+            or_end=orb.get("openingRange", {}).get("end", "09:30"),
+        )
 
+    ind_states = load_intraday_states(d)
     for sym in universe:
         df = fetch_intraday(sym, d)
         if df.empty or len(df) < 20:
             continue
 
+        # Only bars added since the previous run are pushed through the indicators
+        st = catch_up(ind_states.get(sym), df, rsi_period=int(mr.get("rsiPeriod", 14)))
+        ind_states[sym] = st
         df = df.copy()
-        df["atr"] = atr(df, 14)
-        df["vol_avg10"] = df["volume"].rolling(10).mean()
-        df["vwap"] = vwap(df)
-        df["rsi"] = rsi(df["close"], int(mr.get("rsiPeriod", 14)))
+        for col, values in st.history.items():
+            df[col] = values
 
         now_utc = pd.Timestamp(now_ist.astimezone(timezone.utc))
 
         if reg.regime == "trend" and bool(orb.get("enabled", True)):
-            levels = opening_range(df, or_start_utc, or_end_utc)
-            if levels is None:
+            # The day's sector count is fixed during this scan, so a capped sector rules
+            # out every bar of this symbol (the old bar-by-bar `continue` ended the same way)
+            sector = sector_map.get(sym, "UNKNOWN")
+            if bool(sector_cfg.get("enabled", False)) and sector_count_today(sector, d) >= int(sector_cfg.get("maxPerSectorPerDay", 1)):
                 continue
-
-            # OR filters
-            try:
-                or_close = float(df.loc[df.index <= or_end_utc].iloc[-1]["close"])
-            except Exception:
-                or_close = 0.0
-            or_range = float(levels.or_high - levels.or_low)
-            if or_close > 0:
-                if min_or_pct > 0 and (or_range / or_close) * 100 < min_or_pct:
-                    continue
-                if max_or_pct > 0 and (or_range / or_close) * 100 > max_or_pct:
-                    continue
-            if min_or_atr > 0 or max_or_atr > 0:
-                try:
-                    or_row = df.loc[df.index >= or_end_utc].iloc[0]
-                    atr_now = float(or_row.get("atr", 0.0))
-                except Exception:
-                    atr_now = 0.0
-                if atr_now <= 0:
-                    continue
-                if min_or_atr > 0 and (or_range / atr_now) < min_or_atr:
-                    continue
-                if max_or_atr > 0 and (or_range / atr_now) > max_or_atr:
-                    continue
-
-            window = df.loc[(df.index >= or_end_utc) & (df.index <= now_utc)]
-            if window.empty:
-                continue
-
             # Most recent valid entry signal (real-time)
-            for ts, row in window[::-1].iterrows():
-                if pd.isna(row["vol_avg10"]) or pd.isna(row["atr"]):
-                    continue
-                # Volatility clamp
-                atr_pct = (float(row["atr"]) / float(row["close"])) * 100 if float(row["close"]) else 0.0
-                if atr_pct > float(vol_clamp.get("maxAtrPct", 4.0)):
-                    continue
-
-                # NIFTY VWAP filter (optional)
-                nifty_ok_long = True
-                nifty_ok_short = True
-                if require_nifty_vwap and nifty_df is not None and not nifty_df.empty:
-                    ndf2 = nifty_df.loc[nifty_df.index <= ts]
-                    if ndf2.empty:
-                        continue
-                    nrow = ndf2.iloc[-1]
-                    nifty_ok_long = float(nrow["close"]) >= float(nrow["vwap"])
-                    nifty_ok_short = float(nrow["close"]) <= float(nrow["vwap"])
-
-                # Long ORB
-                if bool(orb.get("allowLong", True)) and nifty_ok_long and float(row["close"]) > levels.or_high and float(row["volume"]) >= vol_mult * float(row["vol_avg10"]):
-                    entry_raw = float(row["close"])
-                    atr_now = float(row["atr"])
-                    stop = float(levels.or_high - float(orb.get("stopAtrMult", 0.5)) * atr_now)
-                    if stop < entry_raw:
-                        entry_fill = apply_slippage(entry_raw, "BUY", slip_bps)
-                        risk_per_share = entry_fill - stop
-                        qty = int(r_inr // risk_per_share)
-                        if qty > 0:
-                            target = entry_raw + tgt_r * (entry_raw - stop)
-                            breakout_dist = (entry_raw - levels.or_high) / entry_raw
-                            vol_strength = float(row["volume"]) / float(row["vol_avg10"])
-                            score = 50.0 * breakout_dist + 10.0 * min(vol_strength, 3.0)
-                            grade = grade_from_score(score, grade_thresholds)
-                            sector = sector_map.get(sym, "UNKNOWN")
-                            if bool(sector_cfg.get("enabled", False)) and sector_count_today(sector, d) >= int(sector_cfg.get("maxPerSectorPerDay", 1)):
-                                continue
-                            cand = {
-                                "symbol": sym,
-                                "sector": sector,
-                                "entry_ts_ist": ts.tz_convert(IST).strftime("%Y-%m-%d %H:%M"),
-                                "entry": entry_raw,
-                                "stop": stop,
-                                "target": target,
-                                "qty": qty,
-                                "r_inr": r_inr,
-                                "fixed_cost_inr": fixed_cost,
-                                "score": score,
-                                "grade": grade,
-                                "vol_strength": vol_strength,
-                                "breakout_dist_pct": breakout_dist * 100,
-                                "strategy": "ORB",
-                                "side": "BUY",
-                                "regime": reg.regime,
-                                "trend_dir": reg.trend_dir,
-                            }
-                            if best is None or cand["score"] > best["score"]:
-                                best = cand
-                    break
-
-                # Short ORB
-                if bool(orb.get("allowShort", True)) and nifty_ok_short and float(row["close"]) < levels.or_low and float(row["volume"]) >= vol_mult * float(row["vol_avg10"]):
-                    entry_raw = float(row["close"])
-                    atr_now = float(row["atr"])
-                    stop = float(levels.or_low + float(orb.get("stopAtrMult", 0.5)) * atr_now)
-                    if stop > entry_raw:
-                        entry_fill = apply_slippage(entry_raw, "SELL", slip_bps)
-                        risk_per_share = stop - entry_fill
-                        qty = int(r_inr // risk_per_share)
-                        if qty > 0:
-                            target = entry_raw - tgt_r * (stop - entry_raw)
-                            breakout_dist = (levels.or_low - entry_raw) / entry_raw
-                            vol_strength = float(row["volume"]) / float(row["vol_avg10"])
-                            score = 50.0 * breakout_dist + 10.0 * min(vol_strength, 3.0)
-                            grade = grade_from_score(score, grade_thresholds)
-                            sector = sector_map.get(sym, "UNKNOWN")
-                            if bool(sector_cfg.get("enabled", False)) and sector_count_today(sector, d) >= int(sector_cfg.get("maxPerSectorPerDay", 1)):
-                                continue
-                            cand = {
-                                "symbol": sym,
-                                "sector": sector,
-                                "entry_ts_ist": ts.tz_convert(IST).strftime("%Y-%m-%d %H:%M"),
-                                "entry": entry_raw,
-                                "stop": stop,
-                                "target": target,
-                                "qty": qty,
-                                "r_inr": r_inr,
-                                "fixed_cost_inr": fixed_cost,
-                                "score": score,
-                                "grade": grade,
-                                "vol_strength": vol_strength,
-                                "breakout_dist_pct": breakout_dist * 100,
-                                "strategy": "ORB",
-                                "side": "SELL",
-                                "regime": reg.regime,
-                                "trend_dir": reg.trend_dir,
-                            }
-                            if best is None or cand["score"] > best["score"]:
-                                best = cand
-                    break
+            sess = SessionArrays.from_df(df, now_ist.date())
+            levels, e = latest_orb_signal(
+                sess,
+                orb_params,
+                until_epoch=int(now_ist.timestamp()),
+                nifty=nifty,
+                max_atr_pct=float(vol_clamp.get("maxAtrPct", 4.0)),
+                allow_long=bool(orb.get("allowLong", True)),
+                allow_short=bool(orb.get("allowShort", True)),
+            )
+            if e is not None:
+                if e.direction == "BUY":
+                    breakout_dist = (e.entry_raw - levels.or_high) / e.entry_raw
+                else:
+                    breakout_dist = (levels.or_low - e.entry_raw) / e.entry_raw
+                vol_strength = float(sess.volume[e.i]) / float(sess.vol_avg[e.i])
+                score = orb_score(sess, levels, e)
+                cand = {
+                    "symbol": sym,
+                    "sector": sector,
+                    "entry_ts_ist": ist_str(sess.ts[e.i]),
+                    "entry": e.entry_raw,
+                    "stop": e.stop,
+                    "target": e.target,
+                    "qty": e.qty,
+                    "r_inr": r_inr,
+                    "fixed_cost_inr": fixed_cost,
+                    "score": score,
+                    "grade": grade_from_score(score, grade_thresholds),
+                    "vol_strength": vol_strength,
+                    "breakout_dist_pct": breakout_dist * 100,
+                    "strategy": "ORB",
+                    "side": e.direction,
+                    "regime": reg.regime,
+                    "trend_dir": reg.trend_dir,
+                }
+                if best is None or cand["score"] > best["score"]:
+                    best = cand
 
         if reg.regime == "range" and bool(mr.get("enabled", True)):
+            if vwap_anchor or vwap_band_std > 0:
+                set_anchored_vwap(df, now_ist.date(), vwap_anchor)
             window = df.loc[(df.index <= now_utc)]
             if window.empty:
                 continue
@@ -393,6 +314,8 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
             atr_now = float(row["atr"])
             if atr_now <= 0:
                 continue
+            if vwap_band_std > 0 and abs(dist) < vwap_band_std * float(row["vwap_std"]):
+                continue
             rsi_overbought = float(mr.get("rsiOverbought", 70))
             rsi_oversold = float(mr.get("rsiOversold", 30))
             vwap_dist = float(mr.get("vwapAtrDistance", 1.2))
@@ -403,7 +326,7 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
                 # MR short
                 entry_raw = float(row["close"])
                 stop = entry_raw + stop_atr * atr_now
-                entry_fill = apply_slippage(entry_raw, "SELL", slip_bps)
+                entry_fill = apply_slippage(entry_raw, "SELL", bar_slip_bps(row, 0, slip_bps, slippage))
                 risk_per_share = stop - entry_fill
                 qty = int(r_inr // risk_per_share)
                 if qty > 0:
@@ -438,7 +361,7 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
                 # MR long
                 entry_raw = float(row["close"])
                 stop = entry_raw - stop_atr * atr_now
-                entry_fill = apply_slippage(entry_raw, "BUY", slip_bps)
+                entry_fill = apply_slippage(entry_raw, "BUY", bar_slip_bps(row, 0, slip_bps, slippage))
                 risk_per_share = entry_fill - stop
                 qty = int(r_inr // risk_per_share)
                 if qty > 0:
@@ -470,6 +393,7 @@ def find_best_signal(now_ist: datetime) -> Optional[dict]:
                     if best is None or cand["score"] > best["score"]:
                         best = cand
 
+    save_intraday_states(d, ind_states)
     return best
 
 
@@ -1,29 +1,136 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import multiprocessing
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from pathlib import Path
+from typing import Optional
 import zoneinfo
 
+from config import load_config
+from data_cache import day_cache_stamp, write_text_atomic
+from feature_store import materialize
 from trading_days import last_n_trading_days
 from paper_portfolio_execute import run_day
+from regime import fetch_intraday as fetch_regime_intraday
+from sectors import SECTOR_MAP_PATH
+from stocks_in_play import rvol_lookback_dates, sip_cache_path
+from universe import CACHE as UNIVERSE_PATH, load_universe
+from versioning import build_version_stamp, sha256_files
 
 IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 BASE = Path(__file__).resolve().parents[1]
 OUT_DIR = BASE / "reports" / "backtests"
+DAY_CACHE_DIR = BASE / "data" / "backtest_days"
 
 
-def run(days: int = 30) -> dict:
+def warm_shared(dates: list[date]) -> None:
+    """Build what every day reads (valid universe, NIFTY bars) once, before
+    workers fork, so they read those files instead of racing to create them."""
+    load_universe()
+    nifty_symbol = str(load_config().get("filters", {}).get("niftySymbol", "NSE:NIFTY50-INDEX"))
+    for d in dates:
+        fetch_regime_intraday(nifty_symbol, d)
+
+
+def run_days(dates: list[date], workers: int = 1) -> list[dict]:
+    """run_day for each date, in date order; days are independent, so with
+    workers > 1 they are sharded over a process pool (forked where the OS
+    allows, so workers share the already-imported modules and config)."""
+    workers = min(workers, len(dates))
+    if workers <= 1:
+        return [run_day(d) for d in dates]
+    warm_shared(dates)
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return list(pool.map(run_day, dates))
+
+
+def day_key(d: date, version: dict, cfg: dict) -> str:
+    """Cache key of one day's result: date, config/code hashes and every file the
+    day reads (its cached bars, the prior days' bars behind the stocks-in-play
+    RVOL, the universe, sector map and that day's stocks-in-play list)."""
+    data = [day_cache_stamp(d.isoformat())]
+    sip_cfg = cfg.get("filters", {}).get("stocksInPlay", {})
+    if bool(sip_cfg.get("enabled", False)):
+        for ld in rvol_lookback_dates(d, int(sip_cfg.get("lookbackDays", 14))):
+            data.append(day_cache_stamp(ld.isoformat()))
+    parts = {
+        "date": d.isoformat(),
+        "version": version,
+        "data": data,
+        "files": sha256_files([UNIVERSE_PATH, SECTOR_MAP_PATH, sip_cache_path(d)]),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _day_path(d: date, key: str) -> Path:
+    return DAY_CACHE_DIR / f"{d.isoformat()}_{key[:16]}.json"
+
+
+def load_day(d: date, key: str) -> Optional[dict]:
+    """Stored run_day payload, or None when missing/stale."""
+    path = _day_path(d, key)
+    try:
+        if not path.exists():
+            return None
+        stored = json.loads(path.read_text())
+    except Exception:
+        return None
+    if stored.get("key") != key:
+        return None
+    return stored.get("payload")
+
+
+def save_day(d: date, key: str, payload: dict) -> None:
+    DAY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    write_text_atomic(_day_path(d, key), json.dumps({"key": key, "payload": payload}))
+
+
+def default_workers() -> int:
+    """BACKTEST_WORKERS, else one process per CPU offline (FYERS_OFFLINE=1, cache
+    reads only) and a single one online, where workers would share the API quota."""
+    env = int(os.environ.get("BACKTEST_WORKERS", 0))
+    if env:
+        return env
+    if os.environ.get("FYERS_OFFLINE", "0") == "1":
+        return os.cpu_count() or 1
+    return 1
+
+
+def run(days: int = 30, workers: int = 1, use_cache: bool = True) -> dict:
+    """Backtest the last `days` trading days. With use_cache, days whose data,
+    config and code are unchanged since a previous run are read back instead
+    of recomputed."""
     dates = last_n_trading_days(days)
-    payloads = []
+    by_date: dict[date, dict] = {}
+    if use_cache:
+        cfg = load_config()
+        version = build_version_stamp(cfg)
+        for d in dates:
+            cached = load_day(d, day_key(d, version, cfg))
+            if cached is not None:
+                by_date[d] = cached
+    todo = [d for d in dates if d not in by_date]
+    # run_day skips symbols whose stored features fail the OR filters; features
+    # outlive config changes, so mostly this only reads what is already stored
+    materialize(load_universe(), todo)
+    for d, p in zip(todo, run_days(todo, workers)):
+        by_date[d] = p
+        if use_cache:
+            # keyed on the files as the run left them (it may have fetched or rebuilt some)
+            save_day(d, day_key(d, version, cfg), p)
+    payloads = [by_date[d] for d in dates]
     total_r = 0.0
     total_pnl = 0.0
     trades = 0
 
-    for d in dates:
-        p = run_day(d)
-        payloads.append(p)
+    for p in payloads:
         for t in p.get("trades", []):
             total_r += float(t.get("outcome_r", 0))
             total_pnl += float(t.get("pnl_inr", 0))
@@ -47,12 +154,19 @@ def run(days: int = 30) -> dict:
     tag = tag.replace("config.", "").replace("config_", "").replace("config", "paper")
     out_path = OUT_DIR / f"backtest_30d_{datetime.now(tz=IST).strftime('%Y-%m-%d_%H%M%S')}_{tag}.json"
     out_path.write_text(json.dumps(out, indent=2))
-    return {"summary": out, "path": str(out_path)}
+    return {"summary": out, "path": str(out_path), "recomputed": [d.isoformat() for d in todo]}
 
 
 if __name__ == "__main__":
-    res = run(30)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30, help="Number of trading days to backtest")
+    ap.add_argument("--workers", type=int, default=default_workers(), help="Worker processes (default: BACKTEST_WORKERS, else CPU count with FYERS_OFFLINE=1, else 1)")
+    ap.add_argument("--no-cache", action="store_true", help="Recompute every day (ignore stored day results)")
+    args = ap.parse_args()
+
+    res = run(args.days, args.workers, use_cache=not args.no_cache)
     s = res["summary"]
-    print("30D BACKTEST (PAPER PORTFOLIO)")
+    print(f"{args.days}D BACKTEST (PAPER PORTFOLIO)")
     print(f"Trades: {s['trades']} | Total R: {s['total_r']:.2f} | Avg R/trade: {s['avg_r']:.2f} | Total PnL: ₹{s['total_pnl']:.2f}")
+    print(f"Recomputed {len(res['recomputed'])}/{len(s['days'])} days")
     print(f"Saved: {res['path']}")
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional
+
+import zoneinfo
+
+from data_cache import CACHE_BASE, intraday_suffix, read_intraday_candles, merge_intraday
+from timeutil import session_grid
+
+IST = zoneinfo.ZoneInfo("Asia/Kolkata")
+
+
+@dataclass
+class Gap:
+    start: int  # epoch of first missing bar
+    end: int  # epoch of last missing bar
+    bars: int
+
+
+def find_gaps(candles: list, d: date, resolution: str = "5", *, now: Optional[datetime] = None) -> list[Gap]:
+    """Missing session-grid bars for one symbol-day, grouped into contiguous runs.
+
+    A truncated session shows up as a trailing gap. Slots that have not opened
+    yet (today's session) are ignored.
+    """
+    grid = session_grid(d, int(resolution))
+    if now is not None:
+        cutoff = int(now.timestamp()) - int(resolution) * 60
+        grid = [t for t in grid if t <= cutoff]
+    have = {int(c[0]) for c in candles or []}
+
+    gaps: list[Gap] = []
+    run: list[int] = []
+    for t in grid:
+        if t in have:
+            if run:
+                gaps.append(Gap(start=run[0], end=run[-1], bars=len(run)))
+                run = []
+            continue
+        run.append(t)
+    if run:
+        gaps.append(Gap(start=run[0], end=run[-1], bars=len(run)))
+    return gaps
+
+
+def iter_cached_days(resolution: str = "5", symbols: Optional[Iterable[str]] = None) -> Iterable[tuple[str, str]]:
+    """Yield (symbol, YYYY-MM-DD) for every cached intraday file."""
+    wanted = {s.replace(":", "_") for s in symbols} if symbols else None
+    if not CACHE_BASE.exists():
+        return
+    for sym_dir in sorted(CACHE_BASE.iterdir()):
+        if not sym_dir.is_dir():
+            continue
+        if wanted is not None and sym_dir.name not in wanted:
+            continue
+        # _safe_symbol only rewrites the exchange separator
+        symbol = sym_dir.name.replace("_", ":", 1)
+        suffix = intraday_suffix(resolution)
+        for p in sorted(sym_dir.glob(f"*{suffix}")):
+            yield symbol, p.name[: -len(suffix)]
+
+
+def repair_symbol_day(fyers, symbol: str, d_str: str, resolution: str = "5", *, dry_run: bool = False) -> dict:
+    """Fetch only the missing ranges of a cached symbol-day and merge them in."""
+    d = date.fromisoformat(d_str)
+    now = datetime.now(tz=timezone.utc)
+    candles = read_intraday_candles(symbol, d_str, resolution) or []
+    gaps = find_gaps(candles, d, resolution, now=now if d >= now.astimezone(IST).date() else None)
+    out = {"symbol": symbol, "date": d_str, "gaps": len(gaps), "missing": sum(g.bars for g in gaps), "filled": 0}
+    if not gaps or dry_run:
+        return out
+
+    missing = set()
+    fetched: list = []
+    for g in gaps:
+        missing.update(range(g.start, g.end + 1, int(resolution) * 60))
+        try:
+            resp = fyers.history(
+                {
+                    "symbol": symbol,
+                    "resolution": resolution,
+                    "date_format": "0",
+                    "range_from": str(g.start),
+                    "range_to": str(g.end),
+                    "cont_flag": "1",
+                }
+            )
+        except Exception:
+            continue
+        if not isinstance(resp, dict) or resp.get("s") != "ok":
+            continue
+        fetched.extend(c for c in resp.get("candles") or [] if int(c[0]) in missing)
+
+    if fetched:
+        merge_intraday(symbol, d_str, resolution, fetched)
+        out["filled"] = len({int(c[0]) for c in fetched})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--resolution", type=str, default="5", help="Intraday resolution (minutes)")
+    ap.add_argument("--since", type=str, default="", help="Only repair days on/after YYYY-MM-DD")
+    ap.add_argument("--symbols", type=str, default="", help="Comma-separated symbols (default: all cached)")
+    ap.add_argument("--dry-run", action="store_true", help="Report gaps without fetching")
+    args = ap.parse_args()
+
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] or None
+    fyers = None
+    if not args.dry_run:
+        from fyers_client import get_fyers
+
+        fyers = get_fyers()
+
+    total_missing = 0
+    total_filled = 0
+    for symbol, d_str in iter_cached_days(args.resolution, symbols):
+        if args.since and d_str < args.since:
+            continue
+        res = repair_symbol_day(fyers, symbol, d_str, args.resolution, dry_run=args.dry_run)
+        if not res["gaps"]:
+            continue
+        total_missing += res["missing"]
+        total_filled += res["filled"]
+        print(f"{symbol} {d_str}: {res['missing']} missing bars in {res['gaps']} gap(s), filled {res['filled']}")
+
+    print(f"Missing bars: {total_missing} | Filled: {total_filled}")
+
+
+if __name__ == "__main__":
+    main()
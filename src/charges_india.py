@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass(frozen=True)
 class Charges:
@@ -32,8 +34,35 @@ def estimate_equity_intraday_charges(buy_price: float, sell_price: float, qty: i
     Turnover = (buy + sell)*qty
     """
 
-    buy_turn = buy_price * qty
-    sell_turn = sell_price * qty
+    return Charges(*_components(buy_price * qty, sell_price * qty))
+
+
+@dataclass(frozen=True)
+class ChargesArray:
+    """Charge components for many fills at once (one element per trade)."""
+
+    brokerage: np.ndarray
+    stt: np.ndarray
+    exchange_txn: np.ndarray
+    sebi: np.ndarray
+    stamp: np.ndarray
+    gst: np.ndarray
+    total: np.ndarray
+
+
+def estimate_equity_intraday_charges_array(buy_price, sell_price, qty) -> ChargesArray:
+    """Vectorized `estimate_equity_intraday_charges` over price/qty arrays (broadcast).
+
+    Same formulas, so each element equals the scalar estimate exactly.
+    """
+    buy_price = np.asarray(buy_price, dtype=np.float64)
+    sell_price = np.asarray(sell_price, dtype=np.float64)
+    qty = np.asarray(qty)
+    brokerage, *rest = _components(buy_price * qty, sell_price * qty)
+    return ChargesArray(np.zeros_like(rest[-1]) + brokerage, *rest)
+
+
+def _components(buy_turn, sell_turn):
     turnover = buy_turn + sell_turn
 
     brokerage = 0.0
@@ -46,13 +75,4 @@ def estimate_equity_intraday_charges(buy_price: float, sell_price: float, qty: i
     gst = 0.18 * (brokerage + exchange_txn + sebi)
 
     total = brokerage + stt + exchange_txn + sebi + stamp + gst
-
-    return Charges(
-        brokerage=brokerage,
-        stt=stt,
-        exchange_txn=exchange_txn,
-        sebi=sebi,
-        stamp=stamp,
-        gst=gst,
-        total=total,
-    )
+    return brokerage, stt, exchange_txn, sebi, stamp, gst, total
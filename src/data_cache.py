@@ -6,6 +6,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Callable, Optional
 
+import numpy as np
 import pandas as pd
 
 from indicators import to_ohlcv_df
@@ -13,13 +14,24 @@ from indicators import to_ohlcv_df
 BASE = Path(__file__).resolve().parents[1]
 CACHE_BASE = BASE / "data" / "cache"
 
+# Dense resolutions are stored as .npy (n x 6 float64: epoch, o, h, l, c, v)
+# instead of JSON; epochs are exact in float64. No meta block is kept.
+BINARY_RESOLUTIONS = {"1"}
+# Coarser intraday bars can be aggregated from this one when not cached themselves
+FINEST_RESOLUTION = "1"
+
 
 def _safe_symbol(symbol: str) -> str:
     return symbol.replace(":", "_")
 
 
+def intraday_suffix(resolution: str) -> str:
+    ext = "npy" if resolution in BINARY_RESOLUTIONS else "json"
+    return f"_{resolution}.{ext}"
+
+
 def _cache_path_intraday(symbol: str, d: str, resolution: str) -> Path:
-    return CACHE_BASE / _safe_symbol(symbol) / f"{d}_{resolution}.json"
+    return CACHE_BASE / _safe_symbol(symbol) / f"{d}{intraday_suffix(resolution)}"
 
 
 def _cache_path_daily(symbol: str, d: str) -> Path:
@@ -30,6 +42,14 @@ def _offline_enabled() -> bool:
     return os.environ.get("FYERS_OFFLINE", "0") == "1"
 
 
+def write_text_atomic(path: Path, text: str) -> None:
+    """Write through a per-process temp file and rename, so concurrent readers
+    (and writers, e.g. parallel backtest days) never see a partial file."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
 def _read_cache(path: Path) -> Optional[list]:
     try:
         if not path.exists():
@@ -51,7 +71,77 @@ def _write_cache(path: Path, *, symbol: str, d: str, resolution: str, candles: l
         },
         "candles": candles,
     }
-    path.write_text(json.dumps(payload, indent=2))
+    write_text_atomic(path, json.dumps(payload, indent=2))
+
+
+def _read_array(path: Path) -> Optional[np.ndarray]:
+    try:
+        if not path.exists():
+            return None
+        return np.load(path)
+    except Exception:
+        return None
+
+
+def _write_array(path: Path, candles: list) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arr = np.asarray([c[:6] for c in candles], dtype=np.float64).reshape(-1, 6)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    tmp.replace(path)
+
+
+def _array_candles(arr: np.ndarray) -> list:
+    return [[int(row[0]), *row[1:]] for row in arr.tolist()]
+
+
+def _array_df(arr: np.ndarray) -> pd.DataFrame:
+    """Same frame as to_ohlcv_df, built without a per-row Python pass."""
+    idx = pd.to_datetime(arr[:, 0].astype(np.int64), unit="s", utc=True).rename("ts")
+    df = pd.DataFrame(arr[:, 1:6], index=idx, columns=["open", "high", "low", "close", "volume"])
+    return df.sort_index()
+
+
+def _read_stored(symbol: str, d: str, resolution: str) -> Optional[np.ndarray]:
+    path = _cache_path_intraday(symbol, d, resolution)
+    if resolution in BINARY_RESOLUTIONS:
+        return _read_array(path)
+    candles = _read_cache(path)
+    if candles is None:
+        return None
+    return np.asarray([c[:6] for c in candles], dtype=np.float64).reshape(-1, 6)
+
+
+def _aggregate_from_finest(symbol: str, d: str, resolution: str) -> Optional[np.ndarray]:
+    if resolution == FINEST_RESOLUTION or not resolution.isdigit():
+        return None
+    src = _read_stored(symbol, d, FINEST_RESOLUTION)
+    if src is None:
+        return None
+    from resample import resample_arrays  # resample -> feature_store -> data_cache
+
+    ts, ohlcv = resample_arrays(src[:, 0].astype(np.int64), src[:, 1:6], datetime.strptime(d, "%Y-%m-%d").date(), resolution)
+    return np.column_stack([ts.astype(np.float64), ohlcv])
+
+
+def read_intraday_array(symbol: str, d: str, resolution: str) -> Optional[np.ndarray]:
+    """Cached bars as an (n, 6) float64 array, None if not cached.
+
+    A missing resolution is aggregated on read from cached 1m bars when present.
+    """
+    arr = _read_stored(symbol, d, resolution)
+    if arr is None:
+        arr = _aggregate_from_finest(symbol, d, resolution)
+    return arr
+
+
+def _store_intraday(symbol: str, d: str, resolution: str, candles: list) -> None:
+    path = _cache_path_intraday(symbol, d, resolution)
+    if resolution in BINARY_RESOLUTIONS:
+        _write_array(path, candles)
+    else:
+        _write_cache(path, symbol=symbol, d=d, resolution=resolution, candles=candles)
 
 
 def get_intraday(
@@ -64,18 +154,81 @@ def get_intraday(
 
     fetch_fn should return raw FYERS candles list.
     """
-    path = _cache_path_intraday(symbol, d, resolution)
-    candles = _read_cache(path)
-    if candles is None:
+    if resolution not in BINARY_RESOLUTIONS:
+        candles = _read_cache(_cache_path_intraday(symbol, d, resolution))
+        if candles is not None:
+            return to_ohlcv_df(candles) if candles else pd.DataFrame()
+
+    arr = read_intraday_array(symbol, d, resolution)
+    if arr is None:
         if _offline_enabled():
             return pd.DataFrame()
         candles = fetch_fn() or []
-        if candles:
-            _write_cache(path, symbol=symbol, d=d, resolution=resolution, candles=candles)
+        if not candles:
+            return pd.DataFrame()
+        _store_intraday(symbol, d, resolution, candles)
+        return to_ohlcv_df(candles)
 
-    if not candles:
+    if not len(arr):
         return pd.DataFrame()
-    return to_ohlcv_df(candles)
+    return _array_df(arr)
+
+
+def read_intraday_candles(symbol: str, d: str, resolution: str) -> Optional[list]:
+    """Raw cached candles for a symbol-day (None if not cached)."""
+    if resolution not in BINARY_RESOLUTIONS:
+        candles = _read_cache(_cache_path_intraday(symbol, d, resolution))
+        if candles is not None:
+            return candles
+    arr = read_intraday_array(symbol, d, resolution)
+    return None if arr is None else _array_candles(arr)
+
+
+def intraday_cache_stamp(symbol: str, d: str, resolution: str) -> Optional[dict]:
+    """Cheap change detector for a cached symbol-day (mtime + size).
+
+    Falls back to the 1m file when the bars are aggregated from it.
+    """
+    for res in (resolution, FINEST_RESOLUTION):
+        try:
+            st = _cache_path_intraday(symbol, d, res).stat()
+        except OSError:
+            continue
+        return {"resolution": res, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    return None
+
+
+def day_cache_stamp(d: str) -> list:
+    """(file, mtime_ns, size) of every cached file for date `d` (intraday and
+    daily, all symbols): changes when any of that day's data is written."""
+    paths = sorted(CACHE_BASE.glob(f"*/{d}_*")) + sorted(CACHE_BASE.glob(f"*/daily_{d}.json"))
+    out = []
+    for p in paths:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        out.append([f"{p.parent.name}/{p.name}", st.st_mtime_ns, st.st_size])
+    return out
+
+
+def merge_intraday(symbol: str, d: str, resolution: str, candles: list) -> list:
+    """Merge `candles` into the cached symbol-day (keyed by epoch) and rewrite it.
+
+    Existing bars win over incoming ones so a repair never rewrites history.
+    """
+    merged = {int(c[0]): c for c in candles}
+    if resolution in BINARY_RESOLUTIONS:
+        stored = _read_array(_cache_path_intraday(symbol, d, resolution))
+        existing = _array_candles(stored) if stored is not None else []
+    else:
+        existing = _read_cache(_cache_path_intraday(symbol, d, resolution)) or []
+    for c in existing:
+        merged[int(c[0])] = c
+    out = [merged[k] for k in sorted(merged)]
+    if out:
+        _store_intraday(symbol, d, resolution, out)
+    return out
 
 
 def get_daily(
@@ -56,7 +56,7 @@ def _calc_stats(logs: list[dict]) -> dict:
     return {"days": len(daily_r), "avg_r": avg_r, "max_dd": max_dd}
 
 
-def _load_risk_state() -> dict:
+def load_risk_state() -> dict:
     if RISK_STATE_PATH.exists():
         try:
             return json.loads(RISK_STATE_PATH.read_text())
@@ -86,7 +86,7 @@ def run() -> str:
 
     should_pause = (stats["avg_r"] < min_avg_r) or (stats["max_dd"] <= -max_dd_r)
 
-    state = _load_risk_state()
+    state = load_risk_state()
     today = datetime.now(tz=IST).date()
     if should_pause:
         paused_until = (today + timedelta(days=pause_days)).strftime("%Y-%m-%d")
@@ -0,0 +1,270 @@
+"""Materialized per-symbol-day features.
+
+Holds the values every ORB/MR run derives from raw candles (OR levels for each
+configured OR window, ATR at OR end, vol_avg10, first-bar volume, session VWAP,
+OR range %). Entries carry a version built from the feature code + configured
+OR windows and a stamp of the source cache file, so stale entries are rebuilt
+automatically.
+
+Readers: paper_portfolio_execute.run_day uses stored features (never loading
+bars) as an OR-filter prefilter, which is how backtest_30d uses them; both it
+and the nightly graph node materialize the days they need. The nightly ORB
+sweep does not, since it sweeps the OR filters themselves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import zoneinfo
+
+import indicator_kernels as kernels
+from data_cache import intraday_cache_stamp, read_intraday_candles
+from data_quality import clean_ohlcv_df
+from indicators import epoch_seconds, to_ohlcv_df
+from orb_engine import or_filters_ok
+from versioning import sha256_files
+
+IST = zoneinfo.ZoneInfo("Asia/Kolkata")
+BASE = Path(__file__).resolve().parents[1]
+FEATURE_DIR = BASE / "data" / "features"
+CONFIG_DIR = BASE / "config"
+
+# Hard-coded window used by paper_orb_execute / nightly_backtest
+DEFAULT_OR_WINDOWS = [("09:15", "09:30")]
+
+
+@lru_cache(maxsize=1)
+def _configured_or_windows() -> tuple[tuple[str, str], ...]:
+    return tuple(configured_or_windows())
+
+
+def configured_or_windows() -> list[tuple[str, str]]:
+    """Every ORB opening-range window found in config/*.json (plus the default)."""
+    windows = set(DEFAULT_OR_WINDOWS)
+    for p in sorted(CONFIG_DIR.glob("*.json")):
+        try:
+            orb = json.loads(p.read_text()).get("strategies", {}).get("ORB", {})
+        except Exception:
+            continue
+        rng = orb.get("openingRange", {})
+        windows.add((str(rng.get("start", "09:15")), str(rng.get("end", "09:30"))))
+    return sorted(windows)
+
+
+@lru_cache(maxsize=None)
+def _version_for(or_windows: tuple[tuple[str, str], ...]) -> str:
+    return feature_version(list(or_windows))
+
+
+def feature_version(or_windows: list[tuple[str, str]]) -> str:
+    files = [
+        BASE / "src" / "feature_store.py",
+        BASE / "src" / "indicator_kernels.py",
+        BASE / "src" / "data_quality.py",
+    ]
+    return sha256_files(files, extra=json.dumps(or_windows))
+
+
+def _epoch(d: date, hhmm: str) -> int:
+    t = datetime.strptime(hhmm, "%H:%M").time()
+    return int(datetime.combine(d, t).replace(tzinfo=IST).timestamp())
+
+
+def window_key(start: str, end: str) -> str:
+    return f"{start}-{end}"
+
+
+def compute_features(df: pd.DataFrame, d: date, or_windows: list[tuple[str, str]]) -> dict:
+    """Derive features from a cleaned intraday frame.
+
+    OR close / ATR-at-OR-end follow the simulators: the close of the last bar at
+    or before OR end, and the ATR of the first bar at or after OR end (None if
+    there is no such bar).
+    """
+    epochs = epoch_seconds(df.index)
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    volume = df["volume"].to_numpy(dtype=np.float64)
+    atr14 = kernels.atr(high, low, close, 14)
+
+    # One cumulative pass per OR start covers every end time sharing it
+    by_start: dict[str, list[str]] = {}
+    for start, end in or_windows:
+        by_start.setdefault(start, []).append(end)
+    levels = {}
+    for start, ends in by_start.items():
+        end_eps = [_epoch(d, e) for e in ends]
+        or_high, or_low, or_close = kernels.opening_ranges(epochs, high, low, close, _epoch(d, start), end_eps)
+        after = np.searchsorted(epochs, end_eps, side="left")
+        for j, end in enumerate(ends):
+            levels[(start, end)] = (or_high[j], or_low[j], or_close[j], after[j])
+
+    ors = {}
+    for start, end in or_windows:
+        oh, ol, oc, after = levels[(start, end)]
+        if np.isnan(oh):
+            ors[window_key(start, end)] = None
+            continue
+        oh, ol = float(oh), float(ol)
+        oc = 0.0 if np.isnan(oc) else float(oc)
+        ors[window_key(start, end)] = {
+            "high": oh,
+            "low": ol,
+            "close": oc,
+            "range_pct": ((oh - ol) / oc) * 100 if oc > 0 else None,
+            "atr_at_end": float(atr14[after]) if after < len(epochs) else None,
+        }
+
+    return {
+        "bars": int(len(df)),
+        "ts": epochs.tolist(),
+        "first_bar_volume": float(volume[0]) if len(volume) else None,
+        "opening_ranges": ors,
+        "atr14": atr14.tolist(),
+        "vol_avg10": kernels.rolling_mean(volume, 10).tolist(),
+        "vwap": kernels.vwap(high, low, close, volume).tolist(),
+    }
+
+
+def _feature_path(symbol: str, d: str, name: str = "") -> Path:
+    return FEATURE_DIR / symbol.replace(":", "_") / (f"{d}_{name}.json" if name else f"{d}.json")
+
+
+def load_features(symbol: str, d: str, *, version: str, resolution: str = "5", name: str = "") -> Optional[dict]:
+    """Stored features, or None when missing/stale (code, config or data changed).
+
+    `name` selects a derived entry stored next to the main one (e.g. "15m" bars).
+    """
+    path = _feature_path(symbol, d, name)
+    try:
+        if not path.exists():
+            return None
+        payload = json.loads(path.read_text())
+    except Exception:
+        return None
+    meta = payload.get("meta", {})
+    if meta.get("version") != version or meta.get("source") != intraday_cache_stamp(symbol, d, resolution):
+        return None
+    return payload.get("features")
+
+
+def save_features(symbol: str, d: str, features: dict, *, version: str, resolution: str = "5", name: str = "") -> None:
+    path = _feature_path(symbol, d, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "meta": {
+            "symbol": symbol,
+            "date": d,
+            "version": version,
+            "source": intraday_cache_stamp(symbol, d, resolution),
+        },
+        "features": features,
+    }
+    path.write_text(json.dumps(payload))
+
+
+def _cached_df(symbol: str, d: date) -> pd.DataFrame:
+    candles = read_intraday_candles(symbol, d.strftime("%Y-%m-%d"), "5")
+    if not candles:
+        return pd.DataFrame()
+    df, _qr = clean_ohlcv_df(to_ohlcv_df(candles), symbol=symbol)
+    return df
+
+
+def get_features(
+    symbol: str,
+    d: date,
+    *,
+    or_windows: Optional[list[tuple[str, str]]] = None,
+    fetch_fn: Optional[Callable[[str, date], pd.DataFrame]] = None,
+) -> Optional[dict]:
+    """Load features for a symbol-day, (re)materializing them if needed."""
+    or_windows = or_windows or list(_configured_or_windows())
+    version = _version_for(tuple(map(tuple, or_windows)))
+    d_str = d.strftime("%Y-%m-%d")
+    feats = load_features(symbol, d_str, version=version)
+    if feats is not None:
+        return feats
+    df = (fetch_fn or _cached_df)(symbol, d)
+    if df is None or df.empty:
+        return None
+    feats = compute_features(df, d, or_windows)
+    save_features(symbol, d_str, feats, version=version)
+    return feats
+
+
+def stored_features(symbol: str, d: date, *, or_windows: Optional[list[tuple[str, str]]] = None) -> Optional[dict]:
+    """Features already on disk and current, else None (never loads bars)."""
+    or_windows = or_windows or list(_configured_or_windows())
+    return load_features(symbol, d.strftime("%Y-%m-%d"), version=_version_for(tuple(map(tuple, or_windows))))
+
+
+def materialize(symbols: Iterable[str], dates: Iterable[date], **kwargs) -> dict[tuple[str, date], dict]:
+    """Build (or refresh) features for every symbol-day; returns what is available."""
+    out = {}
+    for d in dates:
+        for sym in symbols:
+            feats = get_features(sym, d, **kwargs)
+            if feats is not None:
+                out[(sym, d)] = feats
+    return out
+
+
+def passes_or_filters(
+    feats: Optional[dict],
+    or_start: str,
+    or_end: str,
+    *,
+    min_or_range_pct: float = 0.0,
+    min_or_atr_ratio: float = 0.0,
+    max_or_range_pct: float = 0.0,
+    max_or_atr_ratio: float = 0.0,
+) -> bool:
+    """False only when the ORB simulators would reject this symbol-day on OR filters."""
+    if feats is None:
+        return False
+    ors = feats.get("opening_ranges", {})
+    key = window_key(or_start, or_end)
+    if key not in ors:
+        # window not materialized (e.g. an ad-hoc config); let the simulator decide
+        return True
+    orw = ors[key]
+    if orw is None:
+        return False
+    return or_filters_ok(
+        orw["high"],
+        orw["low"],
+        orw["close"],
+        orw["atr_at_end"],
+        min_or_range_pct=min_or_range_pct,
+        max_or_range_pct=max_or_range_pct,
+        min_or_atr_ratio=min_or_atr_ratio,
+        max_or_atr_ratio=max_or_atr_ratio,
+    )
+
+
+def main():
+    from trading_days import last_n_trading_days
+    from universe import load_universe
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30, help="Number of trading days to materialize")
+    args = ap.parse_args()
+
+    dates = last_n_trading_days(args.days)
+    symbols = load_universe()
+    feats = materialize(symbols, dates)
+    print(f"Features ready: {len(feats)} symbol-days ({len(symbols)} symbols x {len(dates)} days)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+GRADE_ORDER = {"B": 0, "A": 1, "A+": 2}
+
+
+def grade_from_score(score: float, thresholds: dict) -> str:
+    aplus = float(thresholds.get("Aplus", 2.0))
+    a = float(thresholds.get("A", 1.2))
+    if score >= aplus:
+        return "A+"
+    if score >= a:
+        return "A"
+    return "B"
+
+
+def grade_rank(g: str) -> int:
+    return GRADE_ORDER.get(str(g).upper().strip(), 0)
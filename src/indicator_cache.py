@@ -0,0 +1,95 @@
+"""Process-wide memoization for atr / ema / vwap / anchored_vwap / rsi.
+
+Entries are keyed by (symbol, date, data fingerprint, indicator, params); the
+fingerprint alone guarantees correctness, symbol/date only make keys readable
+and let callers evict a symbol-day. Same call signatures as indicators.py, so
+modules switch by import. Returned Series are shared: do not mutate them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+MAX_ENTRIES = 4096
+
+_cache: OrderedDict = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def data_fingerprint(obj: pd.DataFrame | pd.Series, columns: tuple[str, ...] = ()) -> str:
+    """Content hash of the index plus the given columns (or the Series values)."""
+    h = hashlib.blake2b(digest_size=16)
+    idx = obj.index
+    h.update(idx.asi8.tobytes() if isinstance(idx, pd.DatetimeIndex) else np.asarray(idx).tobytes())
+    if isinstance(obj, pd.Series):
+        h.update(np.ascontiguousarray(obj.to_numpy(dtype=np.float64)).tobytes())
+    else:
+        for c in columns:
+            h.update(np.ascontiguousarray(obj[c].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def _memo(key: tuple, compute: Callable[[], pd.Series | pd.DataFrame]) -> pd.Series | pd.DataFrame:
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return hit
+    _stats["misses"] += 1
+    out = compute()
+    _cache[key] = out
+    if len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
+        _stats["evictions"] += 1
+    return out
+
+
+def atr(df: pd.DataFrame, period: int = 14, *, symbol: str = "", d: str = "") -> pd.Series:
+    fp = data_fingerprint(df, ("high", "low", "close"))
+    return _memo((symbol, d, fp, "atr", period), lambda: indicators.atr(df, period))
+
+
+def vwap(df: pd.DataFrame, *, symbol: str = "", d: str = "") -> pd.Series:
+    fp = data_fingerprint(df, ("high", "low", "close", "volume"))
+    return _memo((symbol, d, fp, "vwap"), lambda: indicators.vwap(df))
+
+
+def anchored_vwap(df: pd.DataFrame, anchor_utc: Optional[pd.Timestamp] = None, *, symbol: str = "", d: str = "") -> pd.DataFrame:
+    fp = data_fingerprint(df, ("high", "low", "close", "volume"))
+    anchor = None if anchor_utc is None else int(anchor_utc.timestamp())
+    return _memo((symbol, d, fp, "anchored_vwap", anchor), lambda: indicators.anchored_vwap(df, anchor_utc))
+
+
+def ema(series: pd.Series, span: int, *, symbol: str = "", d: str = "") -> pd.Series:
+    fp = data_fingerprint(series)
+    return _memo((symbol, d, fp, "ema", span), lambda: indicators.ema(series, span))
+
+
+def rsi(series: pd.Series, period: int = 14, *, symbol: str = "", d: str = "") -> pd.Series:
+    fp = data_fingerprint(series)
+    return _memo((symbol, d, fp, "rsi", period), lambda: indicators.rsi(series, period))
+
+
+def evict(symbol: str, d: str = "") -> int:
+    """Drop every entry for a symbol (optionally one date); returns how many."""
+    keys = [k for k in _cache if k[0] == symbol and (not d or k[1] == d)]
+    for k in keys:
+        del _cache[k]
+    return len(keys)
+
+
+def clear() -> None:
+    _cache.clear()
+    for k in _stats:
+        _stats[k] = 0
+
+
+def stats() -> dict:
+    return {**_stats, "entries": len(_cache), "max_entries": MAX_ENTRIES}
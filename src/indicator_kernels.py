@@ -0,0 +1,181 @@
+"""Array-level indicator kernels.
+
+Inputs are float64 arrays; the time axis is the last axis, so the same kernels
+work on one symbol (n,) or a panel (symbols, n). Semantics mirror the pandas
+versions in indicators.py (rolling windows need `period` valid values, NaN
+otherwise). Rolling means are cumulative-sum differences rather than pandas'
+running sums, so they can differ from pandas in the last bits; EMA is pandas'
+own ewm.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _f64(x) -> np.ndarray:
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def shift1(x: np.ndarray) -> np.ndarray:
+    out = np.empty_like(x)
+    if x.shape[-1] == 0:
+        return out
+    out[..., 0] = np.nan
+    out[..., 1:] = x[..., :-1]
+    return out
+
+
+def rolling_mean(x, window: int) -> np.ndarray:
+    """Cumulative-sum difference of the non-NaN values plus a NaN count per
+    window (any NaN makes the mean NaN), like streaming_indicators.RollingMean."""
+    x = _f64(x)
+    out = np.full(x.shape, np.nan)
+    if window > 0 and x.shape[-1] >= window:
+        nan = np.isnan(x)
+        pad = [(0, 0)] * (x.ndim - 1) + [(1, 0)]
+        csum = np.pad(np.cumsum(np.where(nan, 0.0, x), axis=-1), pad)
+        cnan = np.pad(np.cumsum(nan, axis=-1), pad)
+        total = csum[..., window:] - csum[..., :-window]
+        nans = cnan[..., window:] - cnan[..., :-window]
+        out[..., window - 1:] = np.where(nans > 0, np.nan, total / window)
+    return out
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high = _f64(high)
+    low = _f64(low)
+    prev_close = shift1(_f64(close))
+    # fmax skips the NaN prev_close on the first bar, like DataFrame.max(axis=1)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def _nan_cumsum(x: np.ndarray) -> np.ndarray:
+    # pandas cumsum: skip NaNs but keep them NaN in the output
+    out = np.nancumsum(x, axis=-1)
+    out[np.isnan(x)] = np.nan
+    return out
+
+
+def vwap(high, low, close, volume) -> np.ndarray:
+    tp = (_f64(high) + _f64(low) + _f64(close)) / 3.0
+    volume = _f64(volume)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _nan_cumsum(tp * volume) / _nan_cumsum(volume)
+
+
+def ema(x, span: int) -> np.ndarray:
+    """pandas ewm(span, adjust=False).mean() along the last axis.
+
+    The recurrence runs in pandas' compiled ewm; a panel goes through it in one
+    call as DataFrame columns.
+    """
+    x = _f64(x)
+    rows = x.reshape(int(np.prod(x.shape[:-1])), x.shape[-1])
+    out = pd.DataFrame(rows.T).ewm(span=span, adjust=False).mean().to_numpy(dtype=np.float64).T
+    return np.ascontiguousarray(out).reshape(x.shape)
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    close = _f64(close)
+    delta = close - shift1(close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    avg_gain = rolling_mean(gain, period)
+    avg_loss = rolling_mean(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+def _rolling_extreme(x, window: int, op) -> np.ndarray:
+    # van Herk / Gil-Werman: per-block prefix and suffix scans, O(n) for any window.
+    # Both scans stay inside the window, so a NaN only poisons windows containing it.
+    x = _f64(x)
+    n = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if window <= 0 or n < window:
+        return out
+    nb = -(-n // window)
+    pad = nb * window - n
+    xp = np.concatenate([x, np.full(x.shape[:-1] + (pad,), np.nan)], axis=-1) if pad else x
+    blocks = xp.reshape(x.shape[:-1] + (nb, window))
+    prefix = op.accumulate(blocks, axis=-1).reshape(xp.shape)
+    suffix = op.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(xp.shape)
+    out[..., window - 1:] = op(suffix[..., : n - window + 1], prefix[..., window - 1: n])
+    return out
+
+
+def rolling_max(x, window: int) -> np.ndarray:
+    """Max over the trailing `window` values (NaN until the window is full)."""
+    return _rolling_extreme(x, window, np.maximum)
+
+
+def rolling_min(x, window: int) -> np.ndarray:
+    """Min over the trailing `window` values (NaN until the window is full)."""
+    return _rolling_extreme(x, window, np.minimum)
+
+
+def opening_ranges(ts, high, low, close, start: int, ends) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """OR high/low/close for several OR end times from one cumulative pass.
+
+    `ts` holds the (sorted) bar-open epochs shared by every row. For each end E
+    the high/low cover bars with start <= ts < E (NaN if there are none) and the
+    close is the last non-NaN close with ts <= E. Outputs are shaped
+    rows + (len(ends),).
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    high, low, close = _f64(high), _f64(low), _f64(close)
+    in_or = ts >= start
+    # fmax/fmin skip the NaNs before `start` and at missing bars
+    cum_high = np.fmax.accumulate(np.where(in_or, high, np.nan), axis=-1)
+    cum_low = np.fmin.accumulate(np.where(in_or, low, np.nan), axis=-1)
+
+    n = ts.shape[0]
+    pos = np.arange(n)
+    last_valid = np.maximum.accumulate(np.where(np.isnan(close), -1, pos), axis=-1)
+    filled = np.take_along_axis(close, np.maximum(last_valid, 0), axis=-1)
+    filled[last_valid < 0] = np.nan
+
+    def _at(arr: np.ndarray, idx: np.ndarray) -> np.ndarray:
+        out = arr[..., np.maximum(idx, 0)] if n else np.full(arr.shape[:-1] + idx.shape, np.nan)
+        out[..., idx < 0] = np.nan
+        return out
+
+    before_end = np.searchsorted(ts, ends, side="left") - 1
+    upto_end = np.searchsorted(ts, ends, side="right") - 1
+    return _at(cum_high, before_end), _at(cum_low, before_end), _at(filled, upto_end)
+
+
+def anchored_vwap(high, low, close, volume, anchor=0) -> tuple[np.ndarray, np.ndarray]:
+    """VWAP and volume-weighted std of typical price from an anchor bar on.
+
+    `anchor` is a bar index (or one per row); bars before it are NaN. With
+    anchor 0 the VWAP equals `vwap()` exactly.
+    """
+    tp = (_f64(high) + _f64(low) + _f64(close)) / 3.0
+    volume = _f64(volume)
+    pos = np.arange(tp.shape[-1])
+    active = pos >= np.asarray(anchor)[..., None] if np.ndim(anchor) else pos >= anchor
+    pv = np.where(active, tp * volume, 0.0)
+    pv2 = np.where(active, tp * tp * volume, 0.0)
+    vol = np.where(active, volume, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cum_vol = _nan_cumsum(vol)
+        avwap = _nan_cumsum(pv) / cum_vol
+        var = _nan_cumsum(pv2) / cum_vol - avwap * avwap
+    avwap = np.where(active, avwap, np.nan)
+    std = np.sqrt(np.maximum(var, 0.0))
+    std[np.isnan(avwap)] = np.nan
+    return avwap, std
+
+
+def anchor_index(ts, epoch) -> np.ndarray | int:
+    """First bar opening at or after `epoch` (session open, OR end, an event bar...)."""
+    return np.searchsorted(np.asarray(ts, dtype=np.int64), epoch, side="left")
@@ -5,6 +5,8 @@ from typing import Optional
 
 import pandas as pd
 
+import indicator_kernels as kernels
+
 
 def to_ohlcv_df(candles: list[list[float]]) -> pd.DataFrame:
     """FYERS history candles → DataFrame.
@@ -17,40 +19,39 @@ def to_ohlcv_df(candles: list[list[float]]) -> pd.DataFrame:
     return df
 
 
+def epoch_seconds(index: pd.DatetimeIndex):
+    """UTC epoch seconds (int64 array) for a tz-aware DatetimeIndex."""
+    return index.as_unit("s").asi8
+
+
+def _col(df: pd.DataFrame, name: str):
+    return df[name].to_numpy(dtype="float64")
+
+
 def ema(series: pd.Series, span: int) -> pd.Series:
-    return series.ewm(span=span, adjust=False).mean()
+    return pd.Series(kernels.ema(series.to_numpy(dtype="float64"), span), index=series.index, name=series.name)
 
 
 def atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
-    prev_close = close.shift(1)
-    tr = pd.concat(
-        [
-            (high - low),
-            (high - prev_close).abs(),
-            (low - prev_close).abs(),
-        ],
-        axis=1,
-    ).max(axis=1)
-    return tr.rolling(period).mean()
+    out = kernels.atr(_col(df, "high"), _col(df, "low"), _col(df, "close"), period)
+    return pd.Series(out, index=df.index)
 
 
 def vwap(df: pd.DataFrame) -> pd.Series:
-    tp = (df["high"] + df["low"] + df["close"]) / 3.0
-    pv = tp * df["volume"]
-    return pv.cumsum() / df["volume"].cumsum()
+    out = kernels.vwap(_col(df, "high"), _col(df, "low"), _col(df, "close"), _col(df, "volume"))
+    return pd.Series(out, index=df.index)
+
+
+def anchored_vwap(df: pd.DataFrame, anchor_utc: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """VWAP from the first bar at/after `anchor_utc` (default: first bar) plus its
+    volume-weighted std, as columns avwap / avwap_std (NaN before the anchor)."""
+    anchor = 0 if anchor_utc is None else int(kernels.anchor_index(epoch_seconds(df.index), int(anchor_utc.timestamp())))
+    out, std = kernels.anchored_vwap(_col(df, "high"), _col(df, "low"), _col(df, "close"), _col(df, "volume"), anchor)
+    return pd.DataFrame({"avwap": out, "avwap_std": std}, index=df.index)
 
 
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
-    delta = series.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = -delta.where(delta < 0, 0.0)
-    avg_gain = gain.rolling(period).mean()
-    avg_loss = loss.rolling(period).mean()
-    rs = avg_gain / avg_loss.replace(0, pd.NA)
-    return 100 - (100 / (1 + rs))
+    return pd.Series(kernels.rsi(series.to_numpy(dtype="float64"), period), index=series.index, name=series.name)
 
 
 @dataclass
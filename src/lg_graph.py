@@ -24,6 +24,7 @@ from watchlist_format import load_items, fmt
 from approval_monitor import main as approval_main
 from daily_report import main as daily_main
 from nightly_backtest import run as nightly_run
+from feature_store import materialize
 from config import load_config
 from trading_days import is_trading_day, is_market_open
 from stocks_in_play import get_stocks_in_play
@@ -108,6 +109,10 @@ def node_daily(state: TradingState) -> TradingState:
 
 def node_nightly(state: TradingState) -> TradingState:
     state["nightly_test_text"] = nightly_run()
+    # Store today's features for the backtests' run_day prefilter
+    d = datetime.now(tz=IST).date()
+    if is_trading_day(d):
+        materialize(load_universe(), [d])
     return state
 
 
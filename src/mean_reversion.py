@@ -7,9 +7,10 @@ from typing import Optional
 import pandas as pd
 import zoneinfo
 
-from indicators import atr, vwap, rsi
-from sim_costs import apply_slippage
+from indicator_cache import anchored_vwap, atr, vwap, rsi
+from sim_costs import SlippageModel, apply_slippage
 from charges_india import estimate_equity_intraday_charges
+from trade_kernels import IntrabarRefiner, resolve_exit
 
 IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 
@@ -18,16 +19,36 @@ IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 class MRTrade:
     symbol: str
     direction: str  # BUY/SELL
-    entry_ts_ist: str
+    entry_ts: int  # bar-open epoch
     entry: float
     stop: float
     target: float
     qty: int
-    exit_ts_ist: str
+    exit_ts: int
     exit_price: float
     pnl_inr: float
     outcome_r: float
     reason: str
+    score: float = 0.0  # approval score: |close - vwap| / ATR at entry
+
+
+def bar_slip_bps(row: pd.Series, qty: int, slippage_bps: float, slippage: Optional[SlippageModel] = None) -> float:
+    """Slippage (bps) of a qty fill on this bar: the model's when given, else the flat bps."""
+    if slippage is None:
+        return slippage_bps
+    return float(slippage.bps(qty, float(row["close"]), float(row["volume"]), float(row["high"]), float(row["low"])))
+
+
+def set_anchored_vwap(df: pd.DataFrame, d: date, vwap_anchor: str = "") -> None:
+    """Replace df's vwap column with the VWAP anchored at `vwap_anchor` ("HH:MM" IST,
+    default: first bar) and add its std as vwap_std."""
+    anchor_utc = None
+    if vwap_anchor:
+        anchor_t = datetime.strptime(vwap_anchor, "%H:%M").time()
+        anchor_utc = pd.Timestamp(datetime.combine(d, anchor_t).replace(tzinfo=IST).astimezone(timezone.utc))
+    av = anchored_vwap(df, anchor_utc)
+    df["vwap"] = av["avwap"]
+    df["vwap_std"] = av["avwap_std"]
 
 
 def simulate_mean_reversion(
@@ -43,13 +64,25 @@ def simulate_mean_reversion(
     vwap_atr_dist: float = 1.2,
     tgt_r: float = 1.2,
     stop_atr: float = 0.8,
+    vwap_anchor: str = "",
+    vwap_band_std: float = 0.0,
+    refiner: Optional[IntrabarRefiner] = None,
+    slippage: Optional[SlippageModel] = None,
 ) -> Optional[MRTrade]:
+    """vwap_anchor ("HH:MM" IST) re-anchors the VWAP (default: session open);
+    vwap_band_std > 0 also requires the close outside VWAP ± that many std.
+    A refiner settles exit bars that touched both stop and target from 1m bars.
+    A slippage model replaces the flat slippage_bps with a per-fill cost."""
+
     if df.empty or len(df) < 30:
         return None
 
     df = df.copy()
     df["atr"] = atr(df, 14)
-    df["vwap"] = vwap(df)
+    if vwap_anchor or vwap_band_std > 0:
+        set_anchored_vwap(df, d, vwap_anchor)
+    else:
+        df["vwap"] = vwap(df)
     df["rsi"] = rsi(df["close"], rsi_period)
 
     start_utc = pd.Timestamp(datetime.combine(d, time(9, 30)).replace(tzinfo=IST).astimezone(timezone.utc))
@@ -69,6 +102,8 @@ def simulate_mean_reversion(
         atr_now = float(row["atr"])
         if atr_now <= 0:
             continue
+        if vwap_band_std > 0 and abs(dist) < vwap_band_std * float(row["vwap_std"]):
+            continue
         if dist >= vwap_atr_dist * atr_now and float(row["rsi"]) >= rsi_overbought:
             direction = "SELL"
             entry_ts = ts
@@ -93,7 +128,7 @@ def simulate_mean_reversion(
         stop_raw = entry_raw + stop_atr * atr_now
         target_raw = entry_raw - tgt_r * (stop_raw - entry_raw)
 
-    entry = apply_slippage(entry_raw, "BUY" if direction == "BUY" else "SELL", slippage_bps)
+    entry = apply_slippage(entry_raw, "BUY" if direction == "BUY" else "SELL", bar_slip_bps(entry_row, 0, slippage_bps, slippage))
     risk_per_share = abs(entry - stop_raw)
     if risk_per_share <= 0:
         return None
@@ -101,39 +136,14 @@ def simulate_mean_reversion(
     qty = int(r_inr // risk_per_share)
     if qty <= 0:
         return None
+    if slippage is not None:
+        entry = apply_slippage(entry_raw, "BUY" if direction == "BUY" else "SELL", bar_slip_bps(entry_row, qty, slippage_bps, slippage))
 
     after = window.loc[window.index >= entry_ts]
-    reason = "time_exit"
-    exit_ts = after.index[-1]
-    exit_raw = float(after.iloc[-1]["close"])
-
-    for ts, row in after.iterrows():
-        lo = float(row["low"])
-        hi = float(row["high"])
-        if direction == "BUY":
-            if lo <= stop_raw:
-                exit_raw = stop_raw
-                exit_ts = ts
-                reason = "stop_hit"
-                break
-            if hi >= target_raw:
-                exit_raw = target_raw
-                exit_ts = ts
-                reason = "target_hit"
-                break
-        else:
-            if hi >= stop_raw:
-                exit_raw = stop_raw
-                exit_ts = ts
-                reason = "stop_hit"
-                break
-            if lo <= target_raw:
-                exit_raw = target_raw
-                exit_ts = ts
-                reason = "target_hit"
-                break
-
-    exit_fill = apply_slippage(exit_raw, "SELL" if direction == "BUY" else "BUY", slippage_bps)
+    i, exit_raw, reason = resolve_exit(after, direction=direction, stop=stop_raw, target=target_raw, refiner=refiner)
+    exit_ts = after.index[i]
+
+    exit_fill = apply_slippage(exit_raw, "SELL" if direction == "BUY" else "BUY", bar_slip_bps(after.iloc[i], qty, slippage_bps, slippage))
     pnl_gross = (exit_fill - entry) * qty if direction == "BUY" else (entry - exit_fill) * qty
     charges = estimate_equity_intraday_charges(entry, exit_fill, qty)
     pnl_net = pnl_gross - charges.total - fixed_cost_inr
@@ -141,14 +151,15 @@ def simulate_mean_reversion(
     return MRTrade(
         symbol="",
         direction=direction,
-        entry_ts_ist=entry_ts.tz_convert(IST).strftime("%Y-%m-%d %H:%M"),
+        entry_ts=int(entry_ts.timestamp()),
         entry=float(entry),
         stop=float(stop_raw),
         target=float(target_raw),
         qty=int(qty),
-        exit_ts_ist=exit_ts.tz_convert(IST).strftime("%Y-%m-%d %H:%M"),
+        exit_ts=int(exit_ts.timestamp()),
         exit_price=float(exit_fill),
         pnl_inr=float(pnl_net),
         outcome_r=float(pnl_net / r_inr),
         reason=reason,
+        score=abs(entry_raw - float(entry_row["vwap"])) / atr_now,
     )
@@ -0,0 +1,641 @@
+"""One ORB strategy engine shared by every entry point.
+
+Paper ORB, the paper portfolio, the nightly sweep and the approval monitor all
+run the same opening range, OR filters, entry mask, stop/target/sizing, exit and
+P&L code here on precomputed arrays. The few places where the old copies
+disagreed are explicit `ORBParams` / `NiftyContext` switches, so each caller
+keeps its historical behavior.
+"""
+
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import zoneinfo
+
+import indicator_kernels as kernels
+from charges_india import estimate_equity_intraday_charges, estimate_equity_intraday_charges_array
+from indicator_cache import vwap
+from indicators import epoch_seconds
+from sim_costs import SlippageModel, apply_slippage, apply_slippage_array
+from trade_kernels import (
+    IntrabarRefiner,
+    first_touch,
+    first_true,
+    first_true_rows,
+    orb_entry_mask,
+    refine_stop_exit,
+    resolve_exits,
+)
+
+IST = zoneinfo.ZoneInfo("Asia/Kolkata")
+
+
+def ist_epoch(d: date, hhmm: str) -> int:
+    t = datetime.strptime(hhmm, "%H:%M").time()
+    return int(datetime.combine(d, t).replace(tzinfo=IST).timestamp())
+
+
+def ist_str(epoch: int) -> str:
+    return datetime.fromtimestamp(int(epoch), tz=IST).strftime("%Y-%m-%d %H:%M")
+
+
+@dataclass(frozen=True)
+class ORBParams:
+    vol_mult: float = 1.2
+    tgt_r: float = 1.5
+    stop_atr_mult: float = 0.5
+    or_start: str = "09:15"
+    or_end: str = "09:30"
+    entry_end: Optional[str] = "11:30"  # None: entries allowed until exit_end
+    exit_end: str = "15:20"
+    min_bars: int = 20
+    min_or_range_pct: float = 0.0
+    max_or_range_pct: float = 0.0
+    min_or_atr_ratio: float = 0.0
+    max_or_atr_ratio: float = 0.0
+    r_inr: float = 125.0
+    slippage_bps: float = 10.0
+    slippage: Optional[SlippageModel] = None  # None: flat slippage_bps
+    fixed_cost_inr: float = 2.0
+    # Historical differences between the copies
+    require_stop_beyond_entry: bool = True  # paper portfolio sized any stop
+    reject_zero_atr: bool = False  # paper portfolio only
+
+
+@dataclass
+class SessionArrays:
+    """One symbol-day as float64 arrays (bar-open epochs in `ts`)."""
+
+    d: date
+    ts: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    atr: np.ndarray
+    vol_avg: np.ndarray
+    refiner: Optional[IntrabarRefiner] = None  # settles stop-vs-target bars from 1m data
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, d: date, *, refiner: Optional[IntrabarRefiner] = None) -> "SessionArrays":
+        """Use the frame's atr / vol_avg10 columns when present, else compute them."""
+        if df.empty:
+            e = np.empty(0, dtype=np.float64)
+            return cls(d, np.empty(0, dtype=np.int64), e, e, e, e, e, e, refiner)
+        col = {c: df[c].to_numpy(dtype=np.float64) for c in ("high", "low", "close", "volume")}
+        atr = df["atr"].to_numpy(dtype=np.float64) if "atr" in df else kernels.atr(col["high"], col["low"], col["close"], 14)
+        vol_avg = df["vol_avg10"].to_numpy(dtype=np.float64) if "vol_avg10" in df else kernels.rolling_mean(col["volume"], 10)
+        return cls(d, epoch_seconds(df.index), col["high"], col["low"], col["close"], col["volume"], atr, vol_avg, refiner)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+@dataclass
+class NiftyContext:
+    """NIFTY close vs session VWAP, looked up at the last index bar <= a time.
+
+    strict: a NaN VWAP (index volume is 0) fails the check; otherwise only a
+    close on the wrong side of VWAP fails it.
+    """
+
+    ts: np.ndarray
+    close: np.ndarray
+    vwap: np.ndarray
+    strict: bool = False
+
+    @classmethod
+    def from_df(cls, df: Optional[pd.DataFrame], *, strict: bool = False) -> Optional["NiftyContext"]:
+        if df is None or df.empty:
+            return None
+        return cls(epoch_seconds(df.index), df["close"].to_numpy(dtype=np.float64), vwap(df).to_numpy(dtype=np.float64), strict)
+
+    def side_ok(self, ts: np.ndarray, direction: str) -> tuple[np.ndarray, np.ndarray]:
+        """(available, ok) per timestamp; unavailable when no index bar precedes it."""
+        idx = np.searchsorted(self.ts, ts, side="right") - 1
+        avail = idx >= 0
+        c = self.close[np.maximum(idx, 0)]
+        v = self.vwap[np.maximum(idx, 0)]
+        if direction == "BUY":
+            ok = c >= v if self.strict else ~(c < v)
+        else:
+            ok = c <= v if self.strict else ~(c > v)
+        return avail, avail & ok
+
+
+@dataclass
+class OpeningRange:
+    or_high: float
+    or_low: float
+    or_close: float  # close of the last bar at/before OR end (0.0 if none)
+    atr_at_end: Optional[float]  # ATR of the first bar at/after OR end
+
+
+@dataclass
+class ORBEntry:
+    i: int  # bar index of the signal
+    direction: str
+    entry_raw: float
+    entry_fill: float
+    stop: float
+    target: float
+    qty: int
+
+
+@dataclass
+class ORBTrade:
+    direction: str
+    entry_i: int
+    entry_ts: int
+    entry_raw: float
+    entry: float  # filled
+    stop: float
+    target: float
+    qty: int
+    exit_i: int
+    exit_ts: int
+    exit_raw: float
+    exit_price: float  # filled
+    reason: str
+    pnl_inr: float
+    outcome_r: float
+    score: float = 0.0  # approval score at the entry bar (orb_score)
+
+
+def opening_levels(s: SessionArrays, p: ORBParams) -> Optional[OpeningRange]:
+    end = ist_epoch(s.d, p.or_end)
+    hi, lo, cl = kernels.opening_ranges(s.ts, s.high, s.low, s.close, ist_epoch(s.d, p.or_start), [end])
+    if np.isnan(hi[0]):
+        return None
+    after = int(np.searchsorted(s.ts, end, side="left"))
+    return OpeningRange(
+        or_high=float(hi[0]),
+        or_low=float(lo[0]),
+        or_close=0.0 if np.isnan(cl[0]) else float(cl[0]),
+        atr_at_end=float(s.atr[after]) if after < len(s) else None,
+    )
+
+
+def or_filters_ok(
+    or_high: float,
+    or_low: float,
+    or_close: float,
+    atr_at_end: Optional[float],
+    *,
+    min_or_range_pct: float = 0.0,
+    max_or_range_pct: float = 0.0,
+    min_or_atr_ratio: float = 0.0,
+    max_or_atr_ratio: float = 0.0,
+) -> bool:
+    """OR size filters. A NaN ATR at OR end (not formed yet) passes the ratio checks."""
+    or_range = float(or_high - or_low)
+    if min_or_range_pct > 0 and or_close > 0:
+        if (or_range / or_close) * 100 < min_or_range_pct:
+            return False
+    if max_or_range_pct > 0 and or_close > 0:
+        if (or_range / or_close) * 100 > max_or_range_pct:
+            return False
+    if min_or_atr_ratio > 0 or max_or_atr_ratio > 0:
+        atr_now = atr_at_end if atr_at_end is not None else 0.0
+        if atr_now <= 0:
+            return False
+        if min_or_atr_ratio > 0 and (or_range / atr_now) < min_or_atr_ratio:
+            return False
+        if max_or_atr_ratio > 0 and (or_range / atr_now) > max_or_atr_ratio:
+            return False
+    return True
+
+
+def _levels_ok(lv: OpeningRange, p: ORBParams) -> bool:
+    return or_filters_ok(
+        lv.or_high,
+        lv.or_low,
+        lv.or_close,
+        lv.atr_at_end,
+        min_or_range_pct=p.min_or_range_pct,
+        max_or_range_pct=p.max_or_range_pct,
+        min_or_atr_ratio=p.min_or_atr_ratio,
+        max_or_atr_ratio=p.max_or_atr_ratio,
+    )
+
+
+def _slip_bps(s: SessionArrays, i, qty, p: ORBParams):
+    """Slippage bps for fills of qty at bar(s) i (scalar or arrays)."""
+    if p.slippage is None:
+        return p.slippage_bps
+    return p.slippage.bps(qty, s.close[i], s.volume[i], s.high[i], s.low[i])
+
+
+def size_entry(s: SessionArrays, i: int, lv: OpeningRange, p: ORBParams, direction: str) -> Optional[ORBEntry]:
+    """Stop / target / qty for a signal at bar i (None if the trade is not sizeable)."""
+    entry_raw = float(s.close[i])
+    atr_now = float(s.atr[i])
+    if p.reject_zero_atr and atr_now <= 0:
+        return None
+    if direction == "BUY":
+        stop = float(lv.or_high - p.stop_atr_mult * atr_now)
+        target = entry_raw + p.tgt_r * (entry_raw - stop)
+        if p.require_stop_beyond_entry and stop >= entry_raw:
+            return None
+    else:
+        stop = float(lv.or_low + p.stop_atr_mult * atr_now)
+        target = entry_raw - p.tgt_r * (stop - entry_raw)
+        if p.require_stop_beyond_entry and stop <= entry_raw:
+            return None
+    entry_fill = apply_slippage(entry_raw, direction, float(_slip_bps(s, i, 0, p)))
+    risk_per_share = abs(entry_fill - stop)
+    if risk_per_share <= 0:
+        return None
+    qty = int(p.r_inr // risk_per_share)
+    if qty <= 0:
+        return None
+    if p.slippage is not None:
+        # sized at the zero-size cost; the fill pays the impact of the actual qty
+        entry_fill = apply_slippage(entry_raw, direction, float(_slip_bps(s, i, qty, p)))
+    return ORBEntry(i, direction, entry_raw, entry_fill, stop, target, qty)
+
+
+def _entry_mask(s: SessionArrays, lo: int, hi: int, lv: OpeningRange, p: ORBParams, direction: str) -> np.ndarray:
+    return orb_entry_mask(
+        s.close[lo:hi],
+        s.volume[lo:hi],
+        s.vol_avg[lo:hi],
+        s.atr[lo:hi],
+        or_high=lv.or_high,
+        or_low=lv.or_low,
+        direction=direction,
+        vol_mult=p.vol_mult,
+    )
+
+
+def close_trade(s: SessionArrays, e: ORBEntry, exit_hi: int, p: ORBParams) -> ORBTrade:
+    """Walk bars e.i .. exit_hi-1 for the first stop/target touch, else exit at the last close."""
+    j, reason = first_touch(s.high[e.i:exit_hi], s.low[e.i:exit_hi], direction=e.direction, stop=e.stop, target=e.target)
+    if j >= 0:
+        reason = refine_stop_exit(s.refiner, s.ts, s.high, s.low, e.i + j, reason, entry_i=e.i, direction=e.direction, stop=e.stop, target=e.target)
+    if reason == "stop_hit":
+        exit_raw = e.stop
+    elif reason == "target_hit":
+        exit_raw = e.target
+    else:
+        j = exit_hi - 1 - e.i
+        exit_raw = float(s.close[exit_hi - 1])
+    exit_i = e.i + j
+
+    exit_fill = apply_slippage(float(exit_raw), "SELL" if e.direction == "BUY" else "BUY", float(_slip_bps(s, exit_i, e.qty, p)))
+    if e.direction == "BUY":
+        pnl_gross = (exit_fill - e.entry_fill) * e.qty
+    else:
+        pnl_gross = (e.entry_fill - exit_fill) * e.qty
+    # Charges take (entry fill, exit fill) for both sides, as every copy did
+    charges = estimate_equity_intraday_charges(e.entry_fill, exit_fill, e.qty)
+    pnl_net = pnl_gross - charges.total - p.fixed_cost_inr
+    return ORBTrade(
+        direction=e.direction,
+        entry_i=e.i,
+        entry_ts=int(s.ts[e.i]),
+        entry_raw=e.entry_raw,
+        entry=float(e.entry_fill),
+        stop=float(e.stop),
+        target=float(e.target),
+        qty=int(e.qty),
+        exit_i=exit_i,
+        exit_ts=int(s.ts[exit_i]),
+        exit_raw=float(exit_raw),
+        exit_price=float(exit_fill),
+        reason=reason,
+        pnl_inr=float(pnl_net),
+        outcome_r=float(pnl_net / p.r_inr),
+    )
+
+
+def simulate_orb(
+    s: SessionArrays,
+    p: ORBParams,
+    direction: str = "BUY",
+    *,
+    nifty: Optional[NiftyContext] = None,
+    require_nifty: bool = False,
+) -> Optional[ORBTrade]:
+    """First ORB entry of the day and its exit, or None.
+
+    The NIFTY check runs at the entry bar only (a failed check means no trade,
+    not a later entry). With require_nifty and no NIFTY data there is no trade.
+    """
+    if len(s) == 0 or len(s) < p.min_bars:
+        return None
+    lv = opening_levels(s, p)
+    if lv is None or not _levels_ok(lv, p):
+        return None
+
+    lo = int(np.searchsorted(s.ts, ist_epoch(s.d, p.or_end), side="left"))
+    exit_hi = int(np.searchsorted(s.ts, ist_epoch(s.d, p.exit_end), side="right"))
+    entry_hi = exit_hi if p.entry_end is None else int(np.searchsorted(s.ts, ist_epoch(s.d, p.entry_end), side="right"))
+    if entry_hi <= lo or exit_hi <= lo:
+        return None
+
+    i = first_true(_entry_mask(s, lo, entry_hi, lv, p, direction))
+    if i < 0 or lo + i >= exit_hi:
+        return None
+    i += lo
+
+    if nifty is not None:
+        _avail, ok = nifty.side_ok(s.ts[i : i + 1], direction)
+        if not ok[0]:
+            return None
+    elif require_nifty:
+        return None
+
+    e = size_entry(s, i, lv, p, direction)
+    if e is None:
+        return None
+    tr = close_trade(s, e, exit_hi, p)
+    tr.score = orb_score(s, lv, e)
+    return tr
+
+
+def orb_score(s: SessionArrays, lv: OpeningRange, e: ORBEntry) -> float:
+    """Approval score: breakout distance past the OR (fraction of entry) and volume surge (capped at 3x)."""
+    if e.direction == "BUY":
+        breakout_dist = (e.entry_raw - lv.or_high) / e.entry_raw
+    else:
+        breakout_dist = (lv.or_low - e.entry_raw) / e.entry_raw
+    vol_strength = float(s.volume[e.i]) / float(s.vol_avg[e.i])
+    return 50.0 * breakout_dist + 10.0 * min(vol_strength, 3.0)
+
+
+def latest_orb_signal(
+    s: SessionArrays,
+    p: ORBParams,
+    *,
+    until_epoch: int,
+    nifty: Optional[NiftyContext] = None,
+    max_atr_pct: float = 4.0,
+    allow_long: bool = True,
+    allow_short: bool = True,
+) -> tuple[Optional[OpeningRange], Optional[ORBEntry]]:
+    """Most recent bar (OR end .. until_epoch) with an ORB signal, sized.
+
+    Bars with unformed indicators, ATR% above `max_atr_pct` or no NIFTY bar yet
+    are skipped; a long signal wins over a short one on the same bar. The entry
+    is None when that latest signal cannot be sized.
+    """
+    if len(s) == 0 or len(s) < p.min_bars:
+        return None, None
+    lv = opening_levels(s, p)
+    if lv is None or not _levels_ok(lv, p):
+        return lv, None
+    lo = int(np.searchsorted(s.ts, ist_epoch(s.d, p.or_end), side="left"))
+    hi = int(np.searchsorted(s.ts, until_epoch, side="right"))
+    if hi <= lo:
+        return lv, None
+
+    close = s.close[lo:hi]
+    atr = s.atr[lo:hi]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = np.where(close != 0, (atr / close) * 100, 0.0)
+    eligible = ~np.isnan(s.vol_avg[lo:hi]) & ~np.isnan(atr) & ~(atr_pct > max_atr_pct)
+
+    masks = {}
+    for direction, allowed in (("BUY", allow_long), ("SELL", allow_short)):
+        m = _entry_mask(s, lo, hi, lv, p, direction) & allowed
+        if nifty is not None:
+            avail, ok = nifty.side_ok(s.ts[lo:hi], direction)
+            eligible &= avail
+            m &= ok
+        masks[direction] = m
+    hits = np.flatnonzero(eligible & (masks["BUY"] | masks["SELL"]))
+    if not len(hits):
+        return lv, None
+    i = int(hits[-1])
+    direction = "BUY" if masks["BUY"][i] else "SELL"
+    return lv, size_entry(s, lo + i, lv, p, direction)
+
+
+GRID_FIELDS = (
+    "vol_mult",
+    "tgt_r",
+    "stop_atr_mult",
+    "entry_end",
+    "min_or_range_pct",
+    "max_or_range_pct",
+    "min_or_atr_ratio",
+    "max_or_atr_ratio",
+)
+
+
+@dataclass
+class ORBGrid:
+    """Parameter combinations: `base` with some GRID_FIELDS swept (one value per combo)."""
+
+    base: ORBParams
+    axes: dict[str, list]
+
+    @classmethod
+    def product(cls, base: ORBParams, **values: Iterable) -> "ORBGrid":
+        """Cartesian product in keyword order (the last keyword varies fastest)."""
+        bad = set(values) - set(GRID_FIELDS)
+        if bad:
+            raise ValueError(f"cannot sweep {sorted(bad)}")
+        names = list(values)
+        combos = list(itertools.product(*(list(v) for v in values.values())))
+        return cls(base, {n: [c[k] for c in combos] for k, n in enumerate(names)})
+
+    def __len__(self) -> int:
+        return len(next(iter(self.axes.values()))) if self.axes else 1
+
+    def col(self, name: str) -> np.ndarray:
+        if name in self.axes:
+            return np.asarray(self.axes[name], dtype=object if name == "entry_end" else np.float64)
+        return np.full(len(self), getattr(self.base, name), dtype=object if name == "entry_end" else np.float64)
+
+    def combo(self, k: int) -> dict:
+        return {n: v[k] for n, v in self.axes.items()}
+
+    def params(self, k: int) -> ORBParams:
+        return replace(self.base, **self.combo(k))
+
+
+@dataclass
+class ORBGridResult:
+    """One row per combination (a session yields at most one ORB trade per combo).
+
+    entry_i is -1 where a combination does not trade; float fields are NaN there.
+    """
+
+    entry_i: np.ndarray
+    entry_ts: np.ndarray
+    entry: np.ndarray
+    stop: np.ndarray
+    target: np.ndarray
+    qty: np.ndarray
+    exit_i: np.ndarray
+    exit_ts: np.ndarray
+    exit_price: np.ndarray
+    reason: np.ndarray  # code into EXIT_REASONS
+    pnl_inr: np.ndarray
+    outcome_r: np.ndarray
+
+    @classmethod
+    def empty(cls, n: int) -> "ORBGridResult":
+        nan = np.full(n, np.nan)
+        none = np.full(n, -1, dtype=np.int64)
+        return cls(none, none.copy(), nan, nan.copy(), nan.copy(), np.zeros(n, dtype=np.int64), none.copy(), none.copy(), nan.copy(), none.copy(), nan.copy(), nan.copy())
+
+    @property
+    def traded(self) -> np.ndarray:
+        return self.entry_i >= 0
+
+
+def _grid_levels_ok(lv: OpeningRange, g: ORBGrid) -> np.ndarray:
+    # or_filters_ok for every combination at once
+    ok = np.ones(len(g), dtype=bool)
+    or_range = float(lv.or_high - lv.or_low)
+    if lv.or_close > 0:
+        pct = (or_range / lv.or_close) * 100
+        min_pct, max_pct = g.col("min_or_range_pct"), g.col("max_or_range_pct")
+        ok &= ~((min_pct > 0) & (pct < min_pct))
+        ok &= ~((max_pct > 0) & (pct > max_pct))
+    min_ratio, max_ratio = g.col("min_or_atr_ratio"), g.col("max_or_atr_ratio")
+    needs_atr = (min_ratio > 0) | (max_ratio > 0)
+    atr_now = lv.atr_at_end if lv.atr_at_end is not None else 0.0
+    if atr_now <= 0:
+        return ok & ~needs_atr
+    ratio = or_range / atr_now
+    ok &= ~((min_ratio > 0) & (ratio < min_ratio))
+    ok &= ~((max_ratio > 0) & (ratio > max_ratio))
+    return ok
+
+
+def simulate_orb_grid(
+    s: SessionArrays,
+    g: ORBGrid,
+    direction: str = "BUY",
+    *,
+    nifty: Optional[NiftyContext] = None,
+    require_nifty: bool = False,
+) -> ORBGridResult:
+    """`simulate_orb` for every combination of `g` in one array pass.
+
+    Entry masks are (combos x bars) over the volume multipliers and entry
+    cut-offs, OR filters / stops / targets are per-combo vectors and every
+    exit is resolved by one `resolve_exits` call. Row k equals
+    simulate_orb(s, g.params(k), ...).
+    """
+    p = g.base
+    n = len(g)
+    out = ORBGridResult.empty(n)
+    if len(s) == 0 or len(s) < p.min_bars:
+        return out
+    lv = opening_levels(s, p)
+    if lv is None:
+        return out
+    ok = _grid_levels_ok(lv, g)
+
+    lo = int(np.searchsorted(s.ts, ist_epoch(s.d, p.or_end), side="left"))
+    exit_hi = int(np.searchsorted(s.ts, ist_epoch(s.d, p.exit_end), side="right"))
+    ends = g.col("entry_end")
+    entry_hi = np.full(n, exit_hi, dtype=np.int64)
+    for e in {x for x in ends if x is not None}:
+        entry_hi[ends == e] = int(np.searchsorted(s.ts, ist_epoch(s.d, e), side="right"))
+    ok &= (entry_hi > lo) & (exit_hi > lo)
+    if not ok.any():
+        return out
+
+    hi = int(entry_hi.max())
+    # (combos, bars): the volume multiplier column broadcasts against the bars
+    mask = orb_entry_mask(
+        s.close[lo:hi],
+        s.volume[lo:hi],
+        s.vol_avg[lo:hi],
+        s.atr[lo:hi],
+        or_high=lv.or_high,
+        or_low=lv.or_low,
+        direction=direction,
+        vol_mult=g.col("vol_mult")[:, None],
+    )
+    mask &= np.arange(lo, hi)[None, :] < entry_hi[:, None]
+    first = first_true_rows(mask)
+    i = lo + np.maximum(first, 0)
+    ok &= (first >= 0) & (i < exit_hi)
+
+    if nifty is not None:
+        _avail, nifty_ok = nifty.side_ok(s.ts[i], direction)
+        ok &= nifty_ok
+    elif require_nifty:
+        ok[:] = False
+
+    entry_raw = s.close[i]
+    atr_now = s.atr[i]
+    stop_mult, tgt_r = g.col("stop_atr_mult"), g.col("tgt_r")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if p.reject_zero_atr:
+            ok &= ~(atr_now <= 0)
+        if direction == "BUY":
+            stop = lv.or_high - stop_mult * atr_now
+            target = entry_raw + tgt_r * (entry_raw - stop)
+            if p.require_stop_beyond_entry:
+                ok &= ~(stop >= entry_raw)
+        else:
+            stop = lv.or_low + stop_mult * atr_now
+            target = entry_raw - tgt_r * (stop - entry_raw)
+            if p.require_stop_beyond_entry:
+                ok &= ~(stop <= entry_raw)
+        entry_fill = apply_slippage_array(entry_raw, direction == "BUY", _slip_bps(s, i, 0, p))
+        risk_per_share = np.abs(entry_fill - stop)
+        ok &= risk_per_share > 0
+        qty = np.floor_divide(p.r_inr, risk_per_share)
+        ok &= qty > 0
+    k = np.flatnonzero(ok)
+    if not len(k):
+        return out
+
+    qty = qty[k].astype(np.int64)
+    if p.slippage is not None:
+        entry_fill[k] = apply_slippage_array(entry_raw[k], direction == "BUY", _slip_bps(s, i[k], qty, p))
+    exit_i, exit_raw, reason = resolve_exits(
+        s.high,
+        s.low,
+        s.close,
+        start=i[k],
+        end=np.full(len(k), exit_hi),
+        is_long=np.full(len(k), direction == "BUY"),
+        stop=stop[k],
+        target=target[k],
+    )
+    if s.refiner is not None:
+        # refine_stop_exit decides; this only narrows the loop to stop exits on a bar that reached the target
+        reached = s.high[exit_i] >= target[k] if direction == "BUY" else s.low[exit_i] <= target[k]
+        for m in np.flatnonzero((reason == 0) & reached):
+            r = refine_stop_exit(
+                s.refiner, s.ts, s.high, s.low, int(exit_i[m]), "stop_hit", entry_i=int(i[k[m]]), direction=direction, stop=stop[k[m]], target=target[k[m]]
+            )
+            if r == "target_hit":
+                reason[m], exit_raw[m] = 1, target[k[m]]
+    exit_fill = apply_slippage_array(exit_raw, direction != "BUY", _slip_bps(s, exit_i, qty, p))
+    if direction == "BUY":
+        pnl_gross = (exit_fill - entry_fill[k]) * qty
+    else:
+        pnl_gross = (entry_fill[k] - exit_fill) * qty
+    charges = estimate_equity_intraday_charges_array(entry_fill[k], exit_fill, qty)
+    pnl_net = pnl_gross - charges.total - p.fixed_cost_inr
+
+    out.entry_i[k] = i[k]
+    out.entry_ts[k] = s.ts[i[k]]
+    out.entry[k] = entry_fill[k]
+    out.stop[k] = stop[k]
+    out.target[k] = target[k]
+    out.qty[k] = qty
+    out.exit_i[k] = exit_i
+    out.exit_ts[k] = s.ts[exit_i]
+    out.exit_price[k] = exit_fill
+    out.reason[k] = reason
+    out.pnl_inr[k] = pnl_net
+    out.outcome_r[k] = pnl_net / p.r_inr
+    return out
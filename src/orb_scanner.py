@@ -10,11 +10,13 @@ import pandas as pd
 import zoneinfo
 
 from fyers_client import get_fyers
-from indicators import to_ohlcv_df, atr, opening_range
+from indicators import to_ohlcv_df, opening_range
+from indicator_cache import atr
 from universe import load_universe
 from data_quality import clean_ohlcv_df
 from data_cache import get_intraday
 from stocks_in_play import get_stocks_in_play
+from volume_profile import load_profile
 
 IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 
@@ -31,6 +33,7 @@ class ORBSignal:
     vol_ok: bool
     breakout: bool
     score: float
+    rvol: Optional[float] = None  # last bar vs its time-of-day average
 
 
 def _utc_ts(d: date, t: time) -> pd.Timestamp:
@@ -83,6 +86,7 @@ def scan_orb_for_date(
     or_end = _utc_ts(d, time(9, 30))
 
     results: list[ORBSignal] = []
+    profile = load_profile()
 
     universe = symbols if symbols is not None else load_universe()
     for symbol in universe:
@@ -95,7 +99,7 @@ def scan_orb_for_date(
             continue
 
         df = df.copy()
-        df["atr"] = atr(df, 14)
+        df["atr"] = atr(df, 14, symbol=symbol, d=d.isoformat())
 
         last = df.iloc[-1]
         last_close = float(last["close"])
@@ -137,6 +141,7 @@ def scan_orb_for_date(
         score += min(20.0, (or_range / last_close) * 1000)  # scaled range contribution
 
         ts_ist = df.index[-1].tz_convert(IST).strftime("%Y-%m-%d %H:%M")
+        rvol = profile.rvol(symbol, int(df.index[-1].timestamp()), last_vol)
 
         results.append(
             ORBSignal(
@@ -150,6 +155,7 @@ def scan_orb_for_date(
                 vol_ok=vol_ok,
                 breakout=breakout,
                 score=score,
+                rvol=rvol,
             )
         )
 
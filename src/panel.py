@@ -0,0 +1,179 @@
+"""Cross-sectional (symbols x bars) intraday panels.
+
+Every symbol is aligned to the regular session grid for the day; bars that are
+missing from the cache are NaN and excluded by `mask`. Indicators are computed
+for the whole universe in one call using the array kernels.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+import zoneinfo
+
+import indicator_kernels as kernels
+from data_cache import read_intraday_array
+from indicators import epoch_seconds
+from timeutil import session_grid
+
+IST = zoneinfo.ZoneInfo("Asia/Kolkata")
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+@dataclass
+class IntradayPanel:
+    d: date
+    symbols: list[str]
+    ts: np.ndarray  # (bars,) epoch seconds of bar opens
+    open: np.ndarray  # (symbols, bars); NaN = missing bar
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @property
+    def mask(self) -> np.ndarray:
+        return ~np.isnan(self.close)
+
+    def row(self, symbol: str) -> int:
+        return self.symbols.index(symbol)
+
+    def epoch(self, hhmm: str) -> int:
+        t = datetime.strptime(hhmm, "%H:%M").time()
+        return int(datetime.combine(self.d, t).replace(tzinfo=IST).timestamp())
+
+
+@dataclass
+class PanelIndicators:
+    atr: np.ndarray
+    vwap: np.ndarray
+    rsi: np.ndarray
+    vol_avg: np.ndarray
+    or_high: np.ndarray  # (symbols,)
+    or_low: np.ndarray
+    mask: np.ndarray
+
+
+def _empty_panel(d: date, symbols: list[str], resolution: str) -> IntradayPanel:
+    ts = np.asarray(session_grid(d, int(resolution)), dtype=np.int64)
+    shape = (len(symbols), len(ts))
+    return IntradayPanel(d, symbols, ts, *(np.full(shape, np.nan) for _ in FIELDS))
+
+
+def _place(panel: IntradayPanel, i: int, epochs: np.ndarray, values: np.ndarray) -> None:
+    pos = np.searchsorted(panel.ts, epochs)
+    ok = (pos < len(panel.ts)) & (panel.ts[np.minimum(pos, len(panel.ts) - 1)] == epochs)
+    for j, name in enumerate(FIELDS):
+        getattr(panel, name)[i, pos[ok]] = values[ok, j]
+
+
+def panel_from_frames(frames: dict[str, pd.DataFrame], d: date, resolution: str = "5") -> IntradayPanel:
+    """Build a panel from per-symbol OHLCV frames (indexed by UTC timestamps)."""
+    panel = _empty_panel(d, list(frames), resolution)
+    for i, df in enumerate(frames.values()):
+        if df is None or df.empty:
+            continue
+        _place(panel, i, epoch_seconds(df.index), df[list(FIELDS)].to_numpy(dtype=np.float64))
+    return panel
+
+
+def load_cached_panel(symbols: Iterable[str], d: date, resolution: str = "5") -> IntradayPanel:
+    """Build a panel straight from cached FYERS candles (no DataFrame round trip)."""
+    symbols = list(symbols)
+    panel = _empty_panel(d, symbols, resolution)
+    d_str = d.strftime("%Y-%m-%d")
+    for i, sym in enumerate(symbols):
+        arr = read_intraday_array(sym, d_str, resolution)
+        if arr is None or not len(arr):
+            continue
+        _place(panel, i, arr[:, 0].astype(np.int64), arr[:, 1:6])
+    return panel
+
+
+def load_panel(symbols: Iterable[str], d: date, fetch_fn: Callable[[str, date], pd.DataFrame], resolution: str = "5") -> IntradayPanel:
+    """Build a panel using a per-symbol fetch helper (e.g. a module's fetch_intraday)."""
+    return panel_from_frames({sym: fetch_fn(sym, d) for sym in symbols}, d, resolution)
+
+
+def _gaps(mask: np.ndarray) -> np.ndarray:
+    """Valid bars whose previous bar is missing although the row has started."""
+    seen_before = np.zeros_like(mask)
+    seen_before[:, 1:] = np.logical_or.accumulate(mask, axis=1)[:, :-1]
+    prev_missing = np.ones_like(mask)
+    prev_missing[:, 1:] = ~mask[:, :-1]
+    return mask & seen_before & prev_missing
+
+
+def panel_rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI per row; a price change across a missing bar poisons its windows."""
+    mask = ~np.isnan(close)
+    delta = close - kernels.shift1(close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    # The first bar of a row counts as "no change", like the per-symbol version
+    bad = ~mask | _gaps(mask)
+    gain[bad] = np.nan
+    loss[bad] = np.nan
+    avg_gain = kernels.rolling_mean(gain, period)
+    avg_loss = kernels.rolling_mean(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+    return 100 - (100 / (1 + rs))
+
+
+def panel_opening_ranges(
+    panel: IntradayPanel, ends: Iterable[str], or_start: str = "09:15"
+) -> dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """(or_high, or_low, or_close) per symbol for each OR end time, in one pass."""
+    ends = list(ends)
+    hi, lo, cl = kernels.opening_ranges(
+        panel.ts, panel.high, panel.low, panel.close, panel.epoch(or_start), [panel.epoch(e) for e in ends]
+    )
+    return {e: (hi[:, j], lo[:, j], cl[:, j]) for j, e in enumerate(ends)}
+
+
+def panel_opening_range(panel: IntradayPanel, or_start: str = "09:15", or_end: str = "09:30") -> tuple[np.ndarray, np.ndarray]:
+    or_high, or_low, _ = panel_opening_ranges(panel, [or_end], or_start)[or_end]
+    return or_high, or_low
+
+
+def compute_panel_indicators(
+    panel: IntradayPanel,
+    *,
+    atr_period: int = 14,
+    rsi_period: int = 14,
+    vol_window: int = 10,
+    or_start: str = "09:15",
+    or_end: str = "09:30",
+) -> PanelIndicators:
+    """ATR, VWAP, RSI, rolling volume mean and OR levels for every symbol at once.
+
+    Rolling windows that include a missing bar are NaN, and every output is NaN
+    at missing bars. On complete data each row equals the per-symbol functions
+    in indicators.py.
+    """
+    mask = panel.mask
+    tr = kernels.true_range(panel.high, panel.low, panel.close)
+    tr[_gaps(mask)] = np.nan
+    out_atr = kernels.rolling_mean(tr, atr_period)
+    out_vwap = kernels.vwap(panel.high, panel.low, panel.close, panel.volume)
+    out_rsi = panel_rsi(panel.close, rsi_period)
+    vol_avg = kernels.rolling_mean(panel.volume, vol_window)
+    or_high, or_low = panel_opening_range(panel, or_start, or_end)
+
+    for arr in (out_atr, out_vwap, out_rsi, vol_avg):
+        arr[~mask] = np.nan
+    return PanelIndicators(
+        atr=out_atr,
+        vwap=out_vwap,
+        rsi=out_rsi,
+        vol_avg=vol_avg,
+        or_high=or_high,
+        or_low=or_low,
+        mask=mask,
+    )
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
-from datetime import datetime, date, time, timezone
+from datetime import datetime, date
 from pathlib import Path
 from typing import Optional
 
@@ -11,17 +10,24 @@ import zoneinfo
 
 from config import load_config
 from fyers_client import get_fyers
-from indicators import to_ohlcv_df, opening_range, atr, vwap
+from indicators import to_ohlcv_df
 from data_quality import clean_ohlcv_df
 from data_cache import get_intraday
-from sim_costs import apply_slippage
-from charges_india import estimate_equity_intraday_charges
 from universe import load_universe
 from versioning import build_version_stamp
 from regime import classify_regime
-from mean_reversion import simulate_mean_reversion, MRTrade
+from mean_reversion import simulate_mean_reversion
+from orb_engine import NiftyContext, ORBParams, ORBTrade, SessionArrays, ist_str, simulate_orb
 from swing_trend import fetch_daily, swing_breakout_signal, swing_pullback_signal
 from stocks_in_play import get_stocks_in_play
+from feature_store import passes_or_filters, stored_features
+from sectors import load_sector_map
+from drift_guard import load_risk_state
+from grades import grade_from_score
+from replay import PRIORITIES, Candidate, gates_from_config, max_trades_gate, portfolio_gates, replay_day
+from sim_costs import SlippageModel, slippage_model_from_config
+from trade_kernels import IntrabarRefiner
+from trade_records import REGIMES, by_entry_time, report_rows, trade_records, trade_row
 
 IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 BASE = Path(__file__).resolve().parents[1]
@@ -29,24 +35,6 @@ LOG_DIR = BASE / "logs"
 REPORT_DIR = BASE / "reports"
 
 
-@dataclass
-class TradeResult:
-    symbol: str
-    strategy: str
-    direction: str
-    entry_ts_ist: str
-    entry: float
-    stop: float
-    target: float
-    qty: int
-    exit_ts_ist: str
-    exit_price: float
-    pnl_inr: float
-    outcome_r: float
-    reason: str
-    notes: dict
-
-
 def fetch_intraday(symbol: str, d: date, resolution: str = "5") -> pd.DataFrame:
     fyers = get_fyers()
     d_str = d.strftime("%Y-%m-%d")
@@ -92,163 +80,30 @@ def simulate_orb_trade(
     entry_end_ist: str = "11:30",
     require_nifty_vwap: bool = False,
     nifty_df: Optional[pd.DataFrame] = None,
-) -> Optional[TradeResult]:
-    if df.empty or len(df) < 20:
-        return None
-
-    or_start_utc = pd.Timestamp(datetime.combine(d, datetime.strptime(or_start, "%H:%M").time()).replace(tzinfo=IST).astimezone(timezone.utc))
-    or_end_utc = pd.Timestamp(datetime.combine(d, datetime.strptime(or_end, "%H:%M").time()).replace(tzinfo=IST).astimezone(timezone.utc))
-
-    levels = opening_range(df, or_start_utc, or_end_utc)
-    if levels is None:
-        return None
-
-    df = df.copy()
-    df["atr"] = atr(df, 14)
-    df["vol_avg10"] = df["volume"].rolling(10).mean()
-
-    # OR filters
-    try:
-        or_close = float(df.loc[df.index <= or_end_utc].iloc[-1]["close"])
-    except Exception:
-        or_close = 0.0
-    or_range = float(levels.or_high - levels.or_low)
-    if min_or_range_pct > 0 and or_close > 0:
-        if (or_range / or_close) * 100 < min_or_range_pct:
-            return None
-    if max_or_range_pct > 0 and or_close > 0:
-        if (or_range / or_close) * 100 > max_or_range_pct:
-            return None
-    if min_or_atr_ratio > 0 or max_or_atr_ratio > 0:
-        try:
-            or_row = df.loc[df.index >= or_end_utc].iloc[0]
-            atr_now = float(or_row.get("atr", 0.0))
-        except Exception:
-            atr_now = 0.0
-        if atr_now <= 0:
-            return None
-        if min_or_atr_ratio > 0 and (or_range / atr_now) < min_or_atr_ratio:
-            return None
-        if max_or_atr_ratio > 0 and (or_range / atr_now) > max_or_atr_ratio:
-            return None
-
-    start_trade_utc = or_end_utc
-    entry_end_time = datetime.strptime(entry_end_ist, "%H:%M").time()
-    entry_end_utc = pd.Timestamp(datetime.combine(d, entry_end_time).replace(tzinfo=IST).astimezone(timezone.utc))
-    end_trade_utc = pd.Timestamp(datetime.combine(d, time(15, 20)).replace(tzinfo=IST).astimezone(timezone.utc))
-
-    entry_window = df.loc[(df.index >= start_trade_utc) & (df.index <= entry_end_utc)]
-    if entry_window.empty:
-        return None
-
-    window = df.loc[(df.index >= start_trade_utc) & (df.index <= end_trade_utc)]
-    if window.empty:
-        return None
-
-    entry_idx = None
-    entry_row = None
-
-    for ts, row in entry_window.iterrows():
-        if pd.isna(row["vol_avg10"]) or pd.isna(row["atr"]):
-            continue
-        if direction == "BUY":
-            cond = float(row["close"]) > levels.or_high
-        else:
-            cond = float(row["close"]) < levels.or_low
-        vol_ok = float(row["volume"]) >= vol_mult * float(row["vol_avg10"])
-        if cond and vol_ok:
-            entry_idx = ts
-            entry_row = row
-            break
-
-    if entry_idx is None or entry_row is None:
-        return None
-
-    if require_nifty_vwap and nifty_df is not None and not nifty_df.empty:
-        ndf = nifty_df.copy()
-        ndf["vwap"] = vwap(ndf)
-        ndf2 = ndf.loc[ndf.index <= entry_idx]
-        if ndf2.empty:
-            return None
-        nrow = ndf2.iloc[-1]
-        if direction == "BUY" and float(nrow["close"]) < float(nrow["vwap"]):
-            return None
-        if direction == "SELL" and float(nrow["close"]) > float(nrow["vwap"]):
-            return None
-
-    entry_raw = float(entry_row["close"])
-    atr_now = float(entry_row["atr"]) if not pd.isna(entry_row["atr"]) else 0.0
-    if atr_now <= 0:
-        return None
-
-    if direction == "BUY":
-        stop_raw = float(levels.or_high - stop_atr_mult * atr_now)
-        target_raw = entry_raw + tgt_r * (entry_raw - stop_raw)
-    else:
-        stop_raw = float(levels.or_low + stop_atr_mult * atr_now)
-        target_raw = entry_raw - tgt_r * (stop_raw - entry_raw)
-
-    entry = apply_slippage(entry_raw, "BUY" if direction == "BUY" else "SELL", slippage_bps)
-    risk_per_share = abs(entry - stop_raw)
-    if risk_per_share <= 0:
-        return None
-
-    qty = int(r_inr // risk_per_share)
-    if qty <= 0:
-        return None
-
-    after = window.loc[window.index >= entry_idx]
-    reason = "time_exit"
-    exit_ts = after.index[-1]
-    exit_raw = float(after.iloc[-1]["close"])
-
-    for ts, row in after.iterrows():
-        lo = float(row["low"])
-        hi = float(row["high"])
-        if direction == "BUY":
-            if lo <= stop_raw:
-                exit_raw = stop_raw
-                exit_ts = ts
-                reason = "stop_hit"
-                break
-            if hi >= target_raw:
-                exit_raw = target_raw
-                exit_ts = ts
-                reason = "target_hit"
-                break
-        else:
-            if hi >= stop_raw:
-                exit_raw = stop_raw
-                exit_ts = ts
-                reason = "stop_hit"
-                break
-            if lo <= target_raw:
-                exit_raw = target_raw
-                exit_ts = ts
-                reason = "target_hit"
-                break
-
-    exit_fill = apply_slippage(exit_raw, "SELL" if direction == "BUY" else "BUY", slippage_bps)
-    pnl_gross = (exit_fill - entry) * qty if direction == "BUY" else (entry - exit_fill) * qty
-    charges = estimate_equity_intraday_charges(entry, exit_fill, qty)
-    pnl_net = pnl_gross - charges.total - fixed_cost_inr
-
-    return TradeResult(
-        symbol="",
-        strategy="ORB",
-        direction=direction,
-        entry_ts_ist=entry_idx.tz_convert(IST).strftime("%Y-%m-%d %H:%M"),
-        entry=float(entry),
-        stop=float(stop_raw),
-        target=float(target_raw),
-        qty=int(qty),
-        exit_ts_ist=exit_ts.tz_convert(IST).strftime("%Y-%m-%d %H:%M"),
-        exit_price=float(exit_fill),
-        pnl_inr=float(pnl_net),
-        outcome_r=float(pnl_net / r_inr),
-        reason=reason,
-        notes={},
+    refiner: Optional[IntrabarRefiner] = None,
+    slippage: Optional[SlippageModel] = None,
+) -> Optional[ORBTrade]:
+    params = ORBParams(
+        vol_mult=vol_mult,
+        tgt_r=tgt_r,
+        stop_atr_mult=stop_atr_mult,
+        or_start=or_start,
+        or_end=or_end,
+        entry_end=entry_end_ist,
+        min_bars=20,
+        min_or_range_pct=min_or_range_pct,
+        max_or_range_pct=max_or_range_pct,
+        min_or_atr_ratio=min_or_atr_ratio,
+        max_or_atr_ratio=max_or_atr_ratio,
+        r_inr=r_inr,
+        slippage_bps=slippage_bps,
+        slippage=slippage,
+        fixed_cost_inr=fixed_cost_inr,
+        require_stop_beyond_entry=False,
+        reject_zero_atr=True,
     )
+    nifty = NiftyContext.from_df(nifty_df) if require_nifty_vwap else None
+    return simulate_orb(SessionArrays.from_df(df, d, refiner=refiner), params, direction, nifty=nifty)
 
 
 def run_day(d: date) -> dict:
@@ -265,6 +120,8 @@ def run_day(d: date) -> dict:
 
     slippage_bps = float(sim_cfg.get("slippageBpsEachSide", 10))
     fixed_cost_inr = float(sim_cfg.get("roundTripFixedCostInr", 2.0))
+    intrabar_refine = bool(sim_cfg.get("intrabarRefine", False))
+    slippage = slippage_model_from_config(sim_cfg)
 
     # Regime classification (uses NIFTY)
     nifty_symbol = str(flt_cfg.get("niftySymbol", "NSE:NIFTY50-INDEX"))
@@ -284,8 +141,7 @@ def run_day(d: date) -> dict:
     regime_sizing = risk_cfg.get("regimeSizing", {"trend": 1.0, "range": 0.7})
     r_inr = r_inr_base * float(regime_sizing.get(reg.regime, 1.0))
 
-    trades: list[TradeResult] = []
-    candidates: list[TradeResult] = []
+    rows: list[tuple] = []  # trade_records rows, epoch timestamps
 
     # ORB (trend days only)
     if reg.regime == "trend" and bool(orb_cfg.get("enabled", True)):
@@ -303,10 +159,25 @@ def run_day(d: date) -> dict:
                 top_n=int(sip_cfg.get("topN", 20)),
             )
 
+        or_start = orb_cfg.get("openingRange", {}).get("start", "09:15")
+        or_end = orb_cfg.get("openingRange", {}).get("end", "09:30")
         for sym in universe:
+            # Cheap reject from stored features only; without them the simulator decides
+            feats = stored_features(sym, d)
+            if feats is not None and not passes_or_filters(
+                feats,
+                or_start,
+                or_end,
+                min_or_range_pct=float(orb_cfg.get("minORRangePct", 0.18)),
+                min_or_atr_ratio=float(orb_cfg.get("minORtoATR", 0.8)),
+                max_or_range_pct=float(orb_cfg.get("maxORRangePct", 0.0)),
+                max_or_atr_ratio=float(orb_cfg.get("maxORtoATR", 0.0)),
+            ):
+                continue
             df = fetch_intraday(sym, d)
             if df.empty:
                 continue
+            refiner = IntrabarRefiner.from_fetch(sym, d, fetch_intraday) if intrabar_refine else None
             if allow_long:
                 tr = simulate_orb_trade(
                     df,
@@ -327,11 +198,11 @@ def run_day(d: date) -> dict:
                     entry_end_ist=str(orb_cfg.get("entryEnd", "11:30")),
                     require_nifty_vwap=require_nifty_vwap,
                     nifty_df=nifty_df,
+                    refiner=refiner,
+                    slippage=slippage,
                 )
                 if tr:
-                    tr.symbol = sym
-                    tr.notes = {"regime": "trend", "trend_dir": reg.trend_dir}
-                    candidates.append(tr)
+                    rows.append(trade_row(sym, "ORB", "trend", tr))
             if allow_short:
                 tr = simulate_orb_trade(
                     df,
@@ -352,11 +223,11 @@ def run_day(d: date) -> dict:
                     entry_end_ist=str(orb_cfg.get("entryEnd", "11:30")),
                     require_nifty_vwap=require_nifty_vwap,
                     nifty_df=nifty_df,
+                    refiner=refiner,
+                    slippage=slippage,
                 )
                 if tr:
-                    tr.symbol = sym
-                    tr.notes = {"regime": "trend", "trend_dir": reg.trend_dir}
-                    candidates.append(tr)
+                    rows.append(trade_row(sym, "ORB", "trend", tr))
 
     # Mean Reversion (range days only)
     if reg.regime == "range" and bool(mr_cfg.get("enabled", True)):
@@ -376,30 +247,55 @@ def run_day(d: date) -> dict:
                 vwap_atr_dist=float(mr_cfg.get("vwapAtrDistance", 1.2)),
                 tgt_r=float(mr_cfg.get("targetR", 1.2)),
                 stop_atr=float(mr_cfg.get("stopAtrMult", 0.8)),
+                vwap_anchor=str(mr_cfg.get("vwapAnchor", "")),
+                vwap_band_std=float(mr_cfg.get("vwapBandStd", 0.0)),
+                refiner=IntrabarRefiner.from_fetch(sym, d, fetch_intraday) if intrabar_refine else None,
+                slippage=slippage,
             )
             if tr:
-                candidates.append(
-                    TradeResult(
-                        symbol=sym,
-                        strategy="MEAN_REVERSION",
-                        direction=tr.direction,
-                        entry_ts_ist=tr.entry_ts_ist,
-                        entry=tr.entry,
-                        stop=tr.stop,
-                        target=tr.target,
-                        qty=tr.qty,
-                        exit_ts_ist=tr.exit_ts_ist,
-                        exit_price=tr.exit_price,
-                        pnl_inr=tr.pnl_inr,
-                        outcome_r=tr.outcome_r,
-                        reason=tr.reason,
-                        notes={"regime": "range", "trend_dir": reg.trend_dir},
-                    )
-                )
+                rows.append(trade_row(sym, "MEAN_REVERSION", "range", tr))
 
     # Select trades by time, cap to maxTradesPerDay
-    candidates.sort(key=lambda t: t.entry_ts_ist)
-    trades = candidates[:max_trades]
+    candidates = by_entry_time(trade_records(rows))
+    replay_gates = bool(sim_cfg.get("replayRiskGates", False))
+    port_cfg = cfg.get("portfolio", {"enabled": False})
+    portfolio = bool(port_cfg.get("enabled", False))
+    if replay_gates or portfolio:
+        # Replay on one clock through the live risk chain (loss stops, cooldown, sectors)
+        # and/or the portfolio limits (MIS margin, concurrent positions per book/sector).
+        # MIS positions are flat overnight, so capital starts fresh each day.
+        # The drift guard's drawdown is a live, start-of-day input: past days replay without it
+        max_dd = float(load_risk_state().get("max_drawdown_r", 0.0)) if d == datetime.now(tz=IST).date() else 0.0
+        gates = gates_from_config(cfg, max_drawdown_r=max_dd) if replay_gates else [max_trades_gate(max_trades)]
+        capital, leverage = 0.0, 1.0
+        if portfolio:
+            gates += portfolio_gates(port_cfg)
+            capital = float(port_cfg.get("capitalInr", 0))
+            leverage = float(port_cfg.get("misLeverage", 5))
+        priority = PRIORITIES[str(port_cfg.get("priority", "input"))]
+        sector_map = load_sector_map()
+        grade_thresholds = cfg.get("telegram", {}).get("gradeThresholds", {"Aplus": 2.0, "A": 1.2})
+        pool = [
+            Candidate(
+                symbol=t["symbol"].decode(),
+                entry_ts=int(t["entry_ts"]),
+                exit_ts=int(t["exit_ts"]),
+                pnl_inr=float(t["pnl_inr"]),
+                sector=sector_map.get(t["symbol"].decode(), "UNKNOWN"),
+                grade=grade_from_score(float(t["score"]), grade_thresholds),
+                regime=REGIMES[t["regime"]],
+                notional=float(t["entry"] * t["qty"]),
+                payload=k,
+            )
+            for k, t in enumerate(candidates)
+        ]
+        for c in pool:
+            c.priority = priority(c)
+        res = replay_day(pool, gates, capital=capital, leverage=leverage)
+        trades = candidates[[c.payload for c in res.taken]]
+        blocked = [{"symbol": c.symbol, "entry_ts_ist": ist_str(c.entry_ts), "decision": reason} for c, reason in res.blocked]
+    else:
+        trades = candidates[:max_trades]
 
     # Swing signals (daily) — logged separately (not executed intraday)
     swing_signals = []
@@ -443,10 +339,12 @@ def run_day(d: date) -> dict:
             "mean_reversion": mr_cfg,
             "swing": swing_cfg,
         },
-        "trades": [t.__dict__ for t in trades],
+        "trades": report_rows(trades, trend_dir=reg.trend_dir),
         "swing_signals": swing_signals,
     }
 
+    if replay_gates or portfolio:
+        payload["blocked"] = blocked
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     (LOG_DIR / f"paper_portfolio_{d.strftime('%Y-%m-%d')}.json").write_text(json.dumps(payload, indent=2))
     return payload
@@ -0,0 +1,135 @@
+"""Cross-sectional ranking over a (symbols x bars) panel.
+
+Every kernel ranks symbols against each other independently at every bar
+(axis 0), ignoring NaN entries, so candidate selection needs no per-symbol loop.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from panel import IntradayPanel, PanelIndicators, compute_panel_indicators
+from volume_profile import VolumeProfile
+
+
+def percentile_rank(x: np.ndarray) -> np.ndarray:
+    """Per-bar percentile rank in (0, 1]; ties get their average rank.
+
+    Same as DataFrame.rank(axis=0, pct=True) on the (symbols, bars) array.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n_sym = x.shape[0]
+    order = np.argsort(x, axis=0, kind="stable")  # NaN sorts last
+    s = np.take_along_axis(x, order, axis=0)
+    pos = np.arange(n_sym)[:, None]
+
+    starts = np.ones(s.shape, dtype=bool)
+    starts[1:] = s[1:] != s[:-1]
+    ends = np.ones(s.shape, dtype=bool)
+    ends[:-1] = s[1:] != s[:-1]
+    first = np.maximum.accumulate(np.where(starts, pos, 0), axis=0)
+    last = np.minimum.accumulate(np.where(ends, pos, n_sym)[::-1], axis=0)[::-1]
+
+    valid = (~np.isnan(x)).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_sorted = ((first + last) / 2.0 + 1.0) / valid
+    out = np.empty_like(x)
+    np.put_along_axis(out, order, pct_sorted, axis=0)
+    out[np.isnan(x)] = np.nan
+    return out
+
+
+def top_k(score: np.ndarray, k: int) -> np.ndarray:
+    """(k, bars) row indices of the highest scores per bar, best first.
+
+    NaN scores are never selected; slots beyond the valid count are -1.
+    """
+    score = np.asarray(score, dtype=np.float64)
+    n_sym = score.shape[0]
+    k = min(k, n_sym)
+    if k <= 0:
+        return np.empty((0,) + score.shape[1:], dtype=np.int64)
+    key = np.where(np.isnan(score), np.inf, -score)
+    idx = np.argpartition(key, k - 1, axis=0)[:k] if k < n_sym else np.argsort(key, axis=0)
+    idx = np.take_along_axis(idx, np.argsort(np.take_along_axis(key, idx, axis=0), axis=0, kind="stable"), axis=0)
+    idx[np.isinf(np.take_along_axis(key, idx, axis=0))] = -1
+    return idx
+
+
+def rank_features(
+    panel: IntradayPanel,
+    ind: PanelIndicators,
+    *,
+    profile: Optional[VolumeProfile] = None,
+    momentum_bars: int = 6,
+) -> dict[str, np.ndarray]:
+    """Raw cross-sectional features per (symbol, bar).
+
+    rvol uses the time-of-day profile when it has sessions, else volume / vol_avg;
+    breakout is the distance beyond the nearer OR side as a fraction of price
+    (negative inside the range); atr_pct is ATR as % of close; momentum is the
+    return over `momentum_bars` bars.
+    """
+    close = panel.close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if profile is not None and profile.count.any():
+            rvol = profile.rvol_panel(panel)
+        else:
+            rvol = np.where(ind.vol_avg > 0, panel.volume / ind.vol_avg, np.nan)
+        up = (close - ind.or_high[:, None]) / close
+        down = (ind.or_low[:, None] - close) / close
+        breakout = np.fmax(up, down)
+        atr_pct = ind.atr / close * 100
+        past = np.full_like(close, np.nan)
+        if momentum_bars < close.shape[1]:
+            past[:, momentum_bars:] = close[:, : close.shape[1] - momentum_bars]
+        momentum = close / past - 1.0
+    return {"rvol": rvol, "breakout": breakout, "atr_pct": atr_pct, "momentum": momentum}
+
+
+def composite_rank(features: dict[str, np.ndarray], weights: Optional[dict[str, float]] = None) -> np.ndarray:
+    """Weighted mean of the per-feature percentile ranks that are available.
+
+    Weights are renormalized over the non-NaN features of each (symbol, bar), so
+    a feature still warming up (ATR needs 14 bars) does not blank the score; it
+    is NaN only when every used feature is NaN.
+    """
+    weights = weights or {name: 1.0 for name in features}
+    acc = wsum = None
+    for name, w in weights.items():
+        r = percentile_rank(features[name])
+        have = ~np.isnan(r)
+        term = np.where(have, r * w, 0.0)
+        wt = np.where(have, float(w), 0.0)
+        acc = term if acc is None else acc + term
+        wsum = wt if wsum is None else wsum + wt
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(wsum > 0, acc / wsum, np.nan)
+
+
+def select_top_symbols(
+    panel: IntradayPanel,
+    k: int,
+    *,
+    at_epoch: int,
+    profile: Optional[VolumeProfile] = None,
+    weights: Optional[dict[str, float]] = None,
+    or_start: str = "09:15",
+    or_end: str = "09:30",
+) -> list[str]:
+    """Top-k symbols by composite rank at the latest bar (with data) opened by `at_epoch`.
+
+    When fewer than k symbols can be scored yet, the whole (unranked) universe
+    is returned rather than a short or empty list.
+    """
+    cols = np.flatnonzero((panel.ts <= at_epoch) & panel.mask.any(axis=0))
+    if not len(cols):
+        return list(panel.symbols)
+    ind = compute_panel_indicators(panel, or_start=or_start, or_end=or_end)
+    score = composite_rank(rank_features(panel, ind, profile=profile), weights)
+    bar = cols[-1]
+    if np.count_nonzero(~np.isnan(score[:, bar])) < k:
+        return list(panel.symbols)
+    return [panel.symbols[i] for i in top_k(score[:, bar : bar + 1], k)[:, 0] if i >= 0]
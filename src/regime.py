@@ -7,7 +7,8 @@ from typing import Optional
 import pandas as pd
 import zoneinfo
 
-from indicators import opening_range, atr, vwap
+from indicators import opening_range
+from indicator_cache import atr, vwap
 from fyers_client import get_fyers
 from data_quality import clean_ohlcv_df
 from indicators import to_ohlcv_df
@@ -66,8 +67,8 @@ def classify_regime(
         return RegimeResult("range", "flat", {"reason": "nifty_data_missing"})
 
     df = df.copy()
-    df["atr"] = atr(df, 14)
-    df["vwap"] = vwap(df)
+    df["atr"] = atr(df, 14, symbol=nifty_symbol, d=d.isoformat())
+    df["vwap"] = vwap(df, symbol=nifty_symbol, d=d.isoformat())
     df["vol_avg10"] = df["volume"].rolling(10).mean()
 
     or_start_dt = datetime.combine(d, datetime.strptime(or_start, "%H:%M").time()).replace(tzinfo=IST)
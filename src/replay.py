@@ -0,0 +1,221 @@
+"""Time-ordered replay of a day's candidate trades through the live risk gates.
+
+The simulators resolve each symbol's trade on its own; this module replays all
+of them on one clock (entries and exits as events, bar-open epochs) with an
+in-memory day state, so maxTradesPerDay, the hard/soft daily loss stops,
+stopAfterLosses, the minimum / drawdown grade checks, the approval cooldown
+and sector caps bind in backtests the way approval_monitor applies them live.
+
+Gates are callbacks `(candidate, state) -> Optional[str]` that return the
+block reason (same strings as the approval log) or None. Portfolio gates add
+capital / MIS margin and concurrent (total and per-sector) position limits;
+signals on the same bar are taken in priority order.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from grades import grade_rank
+
+
+@dataclass
+class Candidate:
+    """A fully simulated trade waiting for the risk gates."""
+
+    symbol: str
+    entry_ts: int  # bar-open epoch of the entry bar (fill at its close)
+    exit_ts: int  # bar-open epoch of the exit bar
+    pnl_inr: float
+    sector: str = "UNKNOWN"
+    grade: Optional[str] = None  # ungraded candidates rank as B and never count as A+
+    regime: str = ""
+    notional: float = 0.0  # entry price x qty
+    priority: float = 0.0  # higher goes first among entries on the same bar
+    payload: object = None  # caller's own trade record
+
+
+@dataclass
+class DayState:
+    realized_pnl: float = 0.0
+    trades: int = 0
+    consec_losses: int = 0
+    open_positions: int = 0
+    last_entry_ts: Optional[int] = None
+    sector_counts: dict[str, int] = field(default_factory=dict)  # entries today
+    sector_open: dict[str, int] = field(default_factory=dict)  # open right now
+    capital: float = 0.0
+    leverage: float = 1.0  # intraday (MIS) leverage: margin = notional / leverage
+    margin_used: float = 0.0
+
+    @property
+    def available_margin(self) -> float:
+        return self.capital + self.realized_pnl - self.margin_used
+
+    def margin(self, c: Candidate) -> float:
+        return c.notional / self.leverage
+
+    def enter(self, c: Candidate) -> None:
+        self.trades += 1
+        self.open_positions += 1
+        self.last_entry_ts = c.entry_ts
+        self.sector_counts[c.sector] = self.sector_counts.get(c.sector, 0) + 1
+        self.sector_open[c.sector] = self.sector_open.get(c.sector, 0) + 1
+        self.margin_used += self.margin(c)
+
+    def exit(self, c: Candidate) -> None:
+        self.open_positions -= 1
+        self.sector_open[c.sector] -= 1
+        self.margin_used -= self.margin(c)
+        self.realized_pnl += c.pnl_inr
+        self.consec_losses = self.consec_losses + 1 if c.pnl_inr < 0 else 0
+
+
+Gate = Callable[[Candidate, DayState], Optional[str]]
+
+
+def hard_stop_gate(max_daily_loss_inr: float) -> Gate:
+    return lambda c, st: "blocked_hard_stop" if st.realized_pnl <= -max_daily_loss_inr else None
+
+
+def max_trades_gate(max_trades: int) -> Gate:
+    return lambda c, st: "blocked_max_trades" if st.trades >= max_trades else None
+
+
+def consec_losses_gate(stop_after: int) -> Gate:
+    return lambda c, st: "blocked_consec_losses" if st.consec_losses >= stop_after else None
+
+
+def min_grade_gate(min_grade: str) -> Gate:
+    return lambda c, st: "blocked_min_grade" if grade_rank(c.grade) < grade_rank(min_grade) else None
+
+
+def soft_stop_gate(soft_stop_inr: float) -> Gate:
+    """Past the soft stop only A+ trend trades pass."""
+
+    def gate(c: Candidate, st: DayState) -> Optional[str]:
+        if st.realized_pnl <= -soft_stop_inr and not (c.grade == "A+" and c.regime == "trend"):
+            return "blocked_soft_stop"
+        return None
+
+    return gate
+
+
+def drawdown_aplus_gate(max_drawdown_r: float, aplus_only_r: float) -> Gate:
+    """A+ only while the drift guard's drawdown (known before the day) is at or past -aplus_only_r."""
+    active = max_drawdown_r <= -aplus_only_r
+    return lambda c, st: "blocked_drawdown_aonly" if active and c.grade != "A+" else None
+
+
+def cooldown_gate(minutes: float) -> Gate:
+    def gate(c: Candidate, st: DayState) -> Optional[str]:
+        if st.last_entry_ts is not None and c.entry_ts - st.last_entry_ts < minutes * 60:
+            return "blocked_cooldown"
+        return None
+
+    return gate
+
+
+def sector_gate(max_per_sector: int) -> Gate:
+    return lambda c, st: "blocked_sector" if st.sector_counts.get(c.sector, 0) >= max_per_sector else None
+
+
+def margin_gate() -> Gate:
+    return lambda c, st: "blocked_margin" if st.margin(c) > st.available_margin else None
+
+
+def concurrent_gate(max_open: int) -> Gate:
+    return lambda c, st: "blocked_concurrent" if st.open_positions >= max_open else None
+
+
+def sector_exposure_gate(max_open_per_sector: int) -> Gate:
+    return lambda c, st: "blocked_sector_exposure" if st.sector_open.get(c.sector, 0) >= max_open_per_sector else None
+
+
+def portfolio_gates(portfolio_cfg: dict) -> list[Gate]:
+    """Concurrency caps first, then margin (0 disables a cap)."""
+    gates = []
+    max_open = int(portfolio_cfg.get("maxConcurrent", 0))
+    if max_open > 0:
+        gates.append(concurrent_gate(max_open))
+    max_sector = int(portfolio_cfg.get("maxConcurrentPerSector", 0))
+    if max_sector > 0:
+        gates.append(sector_exposure_gate(max_sector))
+    if float(portfolio_cfg.get("capitalInr", 0)) > 0:
+        gates.append(margin_gate())
+    return gates
+
+
+# Same-bar priority keys (no hindsight: only what is known at entry)
+PRIORITIES: dict[str, Callable[[Candidate], float]] = {
+    "input": lambda c: 0.0,  # keep the caller's order
+    "margin_efficiency": lambda c: -c.notional,  # least capital per trade first
+}
+
+
+def gates_from_config(cfg: dict, *, max_drawdown_r: float = 0.0) -> list[Gate]:
+    """The approval_monitor risk chain, in the same order.
+
+    `max_drawdown_r` is the drift guard's drawdown going into the day (risk
+    state); at 0 the A+-only drawdown gate never binds.
+    """
+    risk = cfg.get("risk", {})
+    gates = [
+        hard_stop_gate(float(risk.get("maxDailyLossInr", 700))),
+        max_trades_gate(int(risk.get("maxTradesPerDay", 3))),
+        consec_losses_gate(int(risk.get("stopAfterLosses", 2))),
+        min_grade_gate(str(cfg.get("telegram", {}).get("minApprovalGrade", "B"))),
+        soft_stop_gate(float(risk.get("softStopLossInr", 500))),
+        drawdown_aplus_gate(max_drawdown_r, float(cfg.get("driftGuard", {}).get("drawdownAplusOnlyR", 2.0))),
+    ]
+    cooldown = float(cfg.get("telegram", {}).get("approvalCooldownMinutes", 0))
+    if cooldown > 0:
+        gates.append(cooldown_gate(cooldown))
+    sector_cfg = cfg.get("sectorFilter", {"enabled": False})
+    if bool(sector_cfg.get("enabled", False)):
+        gates.append(sector_gate(int(sector_cfg.get("maxPerSectorPerDay", 1))))
+    return gates
+
+
+@dataclass
+class ReplayResult:
+    taken: list[Candidate]
+    blocked: list[tuple[Candidate, str]]
+    state: DayState
+
+
+# Event order on one bar: exits of older positions (intrabar), then entries (at
+# the close), then exits of positions opened on that same bar.
+_EXIT, _ENTRY, _SAME_BAR_EXIT = 0, 1, 2
+
+
+def replay_day(
+    candidates: Iterable[Candidate],
+    gates: list[Gate],
+    *,
+    capital: float = 0.0,
+    leverage: float = 1.0,
+) -> ReplayResult:
+    """Gate candidates in entry-time order; same-bar entries by priority, then input order."""
+    st = DayState(capital=capital, leverage=leverage)
+    taken: list[Candidate] = []
+    blocked: list[tuple[Candidate, str]] = []
+    events = [(c.entry_ts, _ENTRY, -c.priority, seq, c) for seq, c in enumerate(candidates)]
+    heapq.heapify(events)
+    seq = len(events)
+    while events:
+        _ts, kind, _prio, _seq, c = heapq.heappop(events)
+        if kind != _ENTRY:
+            st.exit(c)
+            continue
+        reason = next((r for r in (g(c, st) for g in gates) if r), None)
+        if reason:
+            blocked.append((c, reason))
+            continue
+        st.enter(c)
+        taken.append(c)
+        heapq.heappush(events, (c.exit_ts, _SAME_BAR_EXIT if c.exit_ts == c.entry_ts else _EXIT, 0.0, seq, c))
+        seq += 1
+    return ReplayResult(taken, blocked, st)
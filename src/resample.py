@@ -0,0 +1,116 @@
+"""Higher-timeframe bars derived from cached intraday candles.
+
+15m/30m/60m bars are bucketed from the cached base resolution, anchored at the
+09:15 IST session open, and daily bars are rebuilt from the same session. Results
+are memoized in the feature store next to the symbol-day's features and rebuilt
+when the source cache file or this code changes, so higher timeframes never need
+their own FYERS calls or cache tree.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_cache import read_intraday_candles
+from data_quality import clean_ohlcv_df
+from feature_store import load_features, save_features
+from indicators import epoch_seconds, to_ohlcv_df
+from timeutil import IST, SESSION_OPEN
+from versioning import sha256_files
+
+BASE = Path(__file__).resolve().parents[1]
+
+# Timeframes use FYERS resolution strings: minutes or "D"
+TIMEFRAMES = ("15", "30", "60", "D")
+
+
+def _session_anchor(d: date) -> int:
+    return int(datetime.combine(d, SESSION_OPEN).replace(tzinfo=IST).timestamp())
+
+
+def _daily_epoch(d: date) -> int:
+    # FYERS stamps daily candles at 00:00 UTC of the trading date
+    return int(datetime.combine(d, datetime.min.time()).replace(tzinfo=timezone.utc).timestamp())
+
+
+def resample_arrays(ts: np.ndarray, ohlcv: np.ndarray, d: date, timeframe: str) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket sorted bars (ts: (n,), ohlcv: (n, 5)) into `timeframe` bars.
+
+    Each output bar is stamped with its bucket open; open/close come from the
+    first/last input bar, high/low/volume are reduced over the bucket.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    n = len(ts)
+    if n == 0:
+        return ts, ohlcv.reshape(0, 5)
+    if timeframe == "D":
+        bucket = np.zeros(n, dtype=np.int64)
+    else:
+        bucket = (ts - _session_anchor(d)) // (int(timeframe) * 60)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:] - 1, n - 1]
+
+    out = np.empty((len(starts), 5))
+    out[:, 0] = ohlcv[starts, 0]
+    out[:, 1] = np.maximum.reduceat(ohlcv[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(ohlcv[:, 2], starts)
+    out[:, 3] = ohlcv[ends, 3]
+    out[:, 4] = np.add.reduceat(ohlcv[:, 4], starts)
+    if timeframe == "D":
+        out_ts = np.array([_daily_epoch(d)], dtype=np.int64)
+    else:
+        out_ts = _session_anchor(d) + bucket[starts] * int(timeframe) * 60
+    return out_ts, out
+
+
+def resample_df(df: pd.DataFrame, d: date, timeframe: str) -> pd.DataFrame:
+    """Resample an OHLCV frame (UTC index) for one session."""
+    if df.empty:
+        return df
+    ts, out = resample_arrays(
+        epoch_seconds(df.index), df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64), d, timeframe
+    )
+    return to_ohlcv_df([[int(t), *row] for t, row in zip(ts.tolist(), out.tolist())])
+
+
+@lru_cache(maxsize=1)
+def resample_version() -> str:
+    return sha256_files([BASE / "src" / "resample.py", BASE / "src" / "data_quality.py"])
+
+
+def get_resampled(symbol: str, d: date, timeframe: str, *, base_resolution: str = "5") -> pd.DataFrame:
+    """`timeframe` bars for a cached symbol-day (memoized in the feature store)."""
+    d_str = d.strftime("%Y-%m-%d")
+    name = f"{timeframe}m" if timeframe != "D" else "D"
+    kw = {"version": resample_version(), "resolution": base_resolution, "name": name}
+    stored = load_features(symbol, d_str, **kw)
+    if stored is not None:
+        return to_ohlcv_df(stored["candles"]) if stored["candles"] else pd.DataFrame()
+
+    candles = read_intraday_candles(symbol, d_str, base_resolution)
+    if not candles:
+        return pd.DataFrame()
+    df, _qr = clean_ohlcv_df(to_ohlcv_df(candles), symbol=symbol)
+    ts, out = resample_arrays(
+        epoch_seconds(df.index), df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64), d, timeframe
+    )
+    rows = [[int(t), *row] for t, row in zip(ts.tolist(), out.tolist())]
+    save_features(symbol, d_str, {"candles": rows}, **kw)
+    return to_ohlcv_df(rows) if rows else pd.DataFrame()
+
+
+def daily_from_intraday(symbol: str, dates: list[date], *, base_resolution: str = "5") -> pd.DataFrame:
+    """Daily bars rebuilt from cached intraday sessions (days without cache are skipped).
+
+    The close is the last 5m bar's close, not the exchange's official closing
+    price that FYERS daily candles carry, so it can differ slightly.
+    """
+    frames = [get_resampled(symbol, d, "D", base_resolution=base_resolution) for d in dates]
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames) if frames else pd.DataFrame()
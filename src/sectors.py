@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+SECTOR_MAP_PATH = BASE / "data" / "sector_map.json"
+
+
+def load_sector_map() -> dict:
+    """Symbol -> sector from data/sector_map.json ({} if missing or unreadable)."""
+    if SECTOR_MAP_PATH.exists():
+        try:
+            return json.loads(SECTOR_MAP_PATH.read_text())
+        except Exception:
+            return {}
+    return {}
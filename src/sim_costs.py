@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Protocol, Union
+
+import numpy as np
+
 
 def apply_slippage(price: float, side: str, bps_each_side: float) -> float:
     """Apply simple slippage model.
@@ -14,3 +19,76 @@ def apply_slippage(price: float, side: str, bps_each_side: float) -> float:
     if side.upper() == "SELL":
         return price * (1.0 - bps)
     raise ValueError(f"unknown side {side}")
+
+
+def apply_slippage_array(price, is_buy, bps_each_side) -> np.ndarray:
+    """Vectorized `apply_slippage`: is_buy (bool array) picks the side per fill.
+
+    price, is_buy and bps_each_side broadcast against each other.
+    """
+    bps = np.asarray(bps_each_side, dtype=np.float64) / 10000.0
+    return np.asarray(price, dtype=np.float64) * np.where(is_buy, 1.0 + bps, 1.0 - bps)
+
+
+ArrayLike = Union[float, np.ndarray]
+
+
+class SlippageModel(Protocol):
+    """Slippage in bps each side for fills of `qty` at bar price `price`.
+
+    All arguments broadcast, so a model costs any number of fills in one call.
+    """
+
+    def bps(self, qty: ArrayLike, price: ArrayLike, volume: ArrayLike, high: ArrayLike, low: ArrayLike) -> np.ndarray: ...
+
+
+@dataclass(frozen=True)
+class FlatSlippage:
+    """Fixed bps whatever the size or the bar (executionSim.slippageBpsEachSide)."""
+
+    bps_each_side: float = 10.0
+
+    def bps(self, qty, price, volume, high, low) -> np.ndarray:
+        return np.full(np.broadcast(qty, price).shape, self.bps_each_side)
+
+
+@dataclass(frozen=True)
+class LiquiditySlippage:
+    """Half spread plus square-root market impact, both scaled by the bar range.
+
+    range_bps = (high - low) / price; the spread proxy is spread_range_frac of
+    it (at least min_spread_bps) and impact adds impact_coef * range_bps *
+    sqrt(qty / bar volume). A bar without volume counts as full participation.
+    """
+
+    min_spread_bps: float = 2.0
+    spread_range_frac: float = 0.1
+    impact_coef: float = 0.5
+    max_bps: float = 100.0
+
+    def bps(self, qty, price, volume, high, low) -> np.ndarray:
+        price = np.asarray(price, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            range_bps = np.nan_to_num((np.asarray(high) - np.asarray(low)) / price * 10000.0)
+            part = np.where(volume > 0, np.asarray(qty, dtype=np.float64) / volume, 1.0)
+        half_spread = 0.5 * np.maximum(self.min_spread_bps, self.spread_range_frac * range_bps)
+        impact = self.impact_coef * range_bps * np.sqrt(np.clip(part, 0.0, 1.0))
+        return np.minimum(half_spread + impact, self.max_bps)
+
+
+def slippage_model_from_config(sim_cfg: dict) -> SlippageModel:
+    """executionSim.slippageModel ("flat" or "liquidity"); "liquidity" reads its
+    parameters from executionSim.liquiditySlippage."""
+    name = str(sim_cfg.get("slippageModel", "flat"))
+    if name == "flat":
+        return FlatSlippage(float(sim_cfg.get("slippageBpsEachSide", 10)))
+    if name == "liquidity":
+        params = sim_cfg.get("liquiditySlippage", {})
+        return LiquiditySlippage(
+            min_spread_bps=float(params.get("minSpreadBps", 2.0)),
+            spread_range_frac=float(params.get("spreadRangeFrac", 0.1)),
+            impact_coef=float(params.get("impactCoef", 0.5)),
+            max_bps=float(params.get("maxBps", 100.0)),
+        )
+    raise ValueError(f"unknown slippage model {name}")
@@ -8,7 +8,7 @@ from typing import Iterable, Optional
 import pandas as pd
 import zoneinfo
 
-from data_cache import get_intraday
+from data_cache import get_intraday, write_text_atomic
 from fyers_client import get_fyers
 from trading_days import last_n_trading_days
 from data_quality import clean_ohlcv_df
@@ -52,6 +52,16 @@ def _first_candle_volume(df: pd.DataFrame) -> Optional[float]:
         return None
 
 
+def rvol_lookback_dates(d: date, lookback_days: int = 14) -> list[date]:
+    """The prior trading days whose first 5m bar compute_open_rvol averages."""
+    lb_dates = last_n_trading_days(lookback_days + 1)
+    return [x for x in lb_dates if x < d][-lookback_days:]
+
+
+def sip_cache_path(d: date) -> Path:
+    return CACHE_DIR / f"sip_{d.strftime('%Y-%m-%d')}.json"
+
+
 def compute_open_rvol(
     symbol: str,
     d: date,
@@ -64,10 +74,8 @@ def compute_open_rvol(
     if vol_today is None:
         return None
 
-    lb_dates = last_n_trading_days(lookback_days + 1)
-    lb_dates = [x for x in lb_dates if x < d]
     vols = []
-    for ld in lb_dates[-lookback_days:]:
+    for ld in rvol_lookback_dates(d, lookback_days):
         df = _fetch_intraday(symbol, ld.strftime("%Y-%m-%d"))
         v = _first_candle_volume(df)
         if v is not None and v > 0:
@@ -91,7 +99,7 @@ def get_stocks_in_play(
 ) -> list[str]:
     """Return symbols ranked by RVOL, optionally cached per day."""
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_path = CACHE_DIR / f"sip_{d.strftime('%Y-%m-%d')}.json"
+    cache_path = sip_cache_path(d)
 
     if cache_path.exists():
         try:
@@ -122,5 +130,5 @@ def get_stocks_in_play(
         "top_n": top_n,
         "symbols": filtered,
     }
-    cache_path.write_text(json.dumps(payload, indent=2))
+    write_text_atomic(cache_path, json.dumps(payload, indent=2))
     return filtered
@@ -0,0 +1,224 @@
+"""Incremental (one bar at a time) indicator state for live use.
+
+Every object updates in constant time per bar and round-trips through
+`to_dict()` / `from_dict()` so state can be persisted between runs. Values match
+the batch kernels in indicator_kernels.py bar for bar (rolling means are
+running sums, so up to float rounding).
+"""
+
+from __future__ import annotations
+
+import json
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from indicators import epoch_seconds
+
+NAN = float("nan")
+BASE = Path(__file__).resolve().parents[1]
+STATE_DIR = BASE / "data" / "indicator_state"
+
+
+def _plain(items: list) -> dict:
+    # deques are stored as JSON lists
+    return {k: list(v) if isinstance(v, deque) else v for k, v in items}
+
+
+class _State:
+    def to_dict(self) -> dict:
+        return asdict(self, dict_factory=_plain)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+@dataclass
+class RollingMean(_State):
+    """Trailing mean over `window` values: running sum of the non-NaN values
+    plus a count of NaNs in the window (any NaN makes the mean NaN, as in batch)."""
+
+    window: int
+    buf: deque = field(default_factory=deque)
+    total: float = 0.0
+    nans: int = 0
+
+    def __post_init__(self):
+        # rebuilt from the window on load (also reads states saved as a plain list)
+        self.buf = deque(self.buf, maxlen=self.window)
+        self.total = sum(v for v in self.buf if v == v)
+        self.nans = sum(1 for v in self.buf if v != v)
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        if len(self.buf) == self.window:
+            old = self.buf[0]
+            if old != old:
+                self.nans -= 1
+            else:
+                self.total -= old
+        self.buf.append(x)
+        if x != x:
+            self.nans += 1
+        else:
+            self.total += x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if len(self.buf) < self.window or self.nans:
+            return NAN
+        return self.total / self.window
+
+
+@dataclass
+class StreamingATR(_State):
+    period: int = 14
+    prev_close: Optional[float] = None
+    tr: Optional[RollingMean] = None
+
+    def __post_init__(self):
+        if self.tr is None:
+            self.tr = RollingMean(self.period)
+        elif isinstance(self.tr, dict):
+            self.tr = RollingMean.from_dict(self.tr)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = float(close)
+        return self.tr.update(tr)
+
+    @property
+    def value(self) -> float:
+        return self.tr.value
+
+
+@dataclass
+class SessionVWAP(_State):
+    pv: float = 0.0
+    vol: float = 0.0
+
+    def update(self, high: float, low: float, close: float, volume: float) -> float:
+        tp = (high + low + close) / 3.0
+        self.pv += tp * volume
+        self.vol += volume
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.pv / self.vol if self.vol else NAN
+
+
+@dataclass
+class StreamingRSI(_State):
+    period: int = 14
+    prev_close: Optional[float] = None
+    gain: Optional[RollingMean] = None
+    loss: Optional[RollingMean] = None
+
+    def __post_init__(self):
+        for name in ("gain", "loss"):
+            cur = getattr(self, name)
+            if cur is None:
+                setattr(self, name, RollingMean(self.period))
+            elif isinstance(cur, dict):
+                setattr(self, name, RollingMean.from_dict(cur))
+
+    def update(self, close: float) -> float:
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = float(close)
+        self.gain.update(delta if delta > 0 else 0.0)
+        self.loss.update(-delta if delta < 0 else 0.0)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        avg_gain = self.gain.value
+        avg_loss = self.loss.value
+        if avg_gain != avg_gain or avg_loss != avg_loss or avg_loss == 0:
+            return NAN
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+@dataclass
+class IntradayIndicatorState(_State):
+    """Per-symbol bundle used by the approval monitor.
+
+    Keeps the per-bar outputs for the session so callers can still look back
+    over earlier bars without recomputing anything.
+    """
+
+    rsi_period: int = 14
+    last_ts: Optional[int] = None
+    bars: int = 0
+    atr: Optional[StreamingATR] = None
+    vol_avg10: Optional[RollingMean] = None
+    vwap: Optional[SessionVWAP] = None
+    rsi: Optional[StreamingRSI] = None
+    history: dict = field(default_factory=lambda: {"atr": [], "vol_avg10": [], "vwap": [], "rsi": []})
+
+    def __post_init__(self):
+        self.atr = StreamingATR.from_dict(self.atr) if isinstance(self.atr, dict) else (self.atr or StreamingATR(14))
+        self.vol_avg10 = RollingMean.from_dict(self.vol_avg10) if isinstance(self.vol_avg10, dict) else (self.vol_avg10 or RollingMean(10))
+        self.vwap = SessionVWAP.from_dict(self.vwap) if isinstance(self.vwap, dict) else (self.vwap or SessionVWAP())
+        self.rsi = StreamingRSI.from_dict(self.rsi) if isinstance(self.rsi, dict) else (self.rsi or StreamingRSI(self.rsi_period))
+
+    def update(self, candle: list) -> None:
+        """Feed one FYERS candle [epoch, open, high, low, close, volume]."""
+        ts, _o, hi, lo, cl, vol = candle[:6]
+        hi, lo, cl, vol = float(hi), float(lo), float(cl), float(vol)
+        self.history["atr"].append(self.atr.update(hi, lo, cl))
+        self.history["vol_avg10"].append(self.vol_avg10.update(vol))
+        self.history["vwap"].append(self.vwap.update(hi, lo, cl, vol))
+        self.history["rsi"].append(self.rsi.update(cl))
+        self.last_ts = int(ts)
+        self.bars += 1
+
+
+def catch_up(state: Optional[IntradayIndicatorState], df: pd.DataFrame, *, rsi_period: int = 14) -> IntradayIndicatorState:
+    """Feed only the bars of `df` the state has not seen yet.
+
+    The state is rebuilt from scratch if the bars it already consumed no longer
+    line up with `df` (revised cache, different day, different params).
+    """
+    epochs = epoch_seconds(df.index)
+    if (
+        state is None
+        or state.rsi_period != rsi_period
+        or state.bars > len(df)
+        or (state.bars and int(epochs[state.bars - 1]) != state.last_ts)
+    ):
+        state = IntradayIndicatorState(rsi_period=rsi_period)
+    if state.bars < len(df):
+        vals = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype="float64")[state.bars:]
+        for ts, row in zip(epochs[state.bars:].tolist(), vals.tolist()):
+            state.update([ts, *row])
+    return state
+
+
+def _state_path(d: str) -> Path:
+    return STATE_DIR / f"{d}.json"
+
+
+def load_intraday_states(d: str) -> dict[str, IntradayIndicatorState]:
+    path = _state_path(d)
+    try:
+        if not path.exists():
+            return {}
+        raw = json.loads(path.read_text())
+        return {sym: IntradayIndicatorState.from_dict(st) for sym, st in raw.items()}
+    except Exception:
+        return {}
+
+
+def save_intraday_states(d: str, states: dict[str, IntradayIndicatorState]) -> None:
+    path = _state_path(d)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # NaN is valid for json.dumps/json.loads round trips
+    path.write_text(json.dumps({sym: st.to_dict() for sym, st in states.items()}))
@@ -4,10 +4,13 @@ from dataclasses import dataclass
 from datetime import date
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from fyers_client import get_fyers
-from indicators import atr, ema, to_ohlcv_df
+from indicators import to_ohlcv_df
+from indicator_cache import atr, ema
+import indicator_kernels as kernels
 from data_quality import clean_ohlcv_df
 from data_cache import get_daily
 
@@ -49,6 +52,43 @@ def fetch_daily(symbol: str, d: date, lookback_days: int = 120) -> pd.DataFrame:
     return df
 
 
+def swing_breakout_series(
+    df: pd.DataFrame,
+    *,
+    lookback: int = 20,
+    atr_mult: float = 2.0,
+) -> pd.DataFrame:
+    """Breakout signal for every bar of a daily history in one linear pass.
+
+    prior_high/prior_low are the extremes of the `lookback` bars before each bar
+    (O(n) rolling max/min). direction is BUY/SELL on a close beyond them with a
+    formed ATR, else empty.
+    """
+    high = df["high"].to_numpy(dtype=np.float64)
+    low = df["low"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy(dtype=np.float64)
+    atr_now = atr(df, 14).to_numpy(dtype=np.float64)
+    prior_high = kernels.shift1(kernels.rolling_max(high, lookback))
+    prior_low = kernels.shift1(kernels.rolling_min(low, lookback))
+
+    atr_ok = atr_now > 0
+    buy = (close > prior_high) & atr_ok
+    sell = (close < prior_low) & ~buy & atr_ok
+    direction = np.where(buy, "BUY", np.where(sell, "SELL", ""))
+    stop = np.where(buy, close - atr_mult * atr_now, np.where(sell, close + atr_mult * atr_now, np.nan))
+    return pd.DataFrame(
+        {
+            "prior_high": prior_high,
+            "prior_low": prior_low,
+            "atr": atr_now,
+            "direction": direction,
+            "entry": close,
+            "stop": stop,
+        },
+        index=df.index,
+    )
+
+
 def swing_breakout_signal(
     df: pd.DataFrame,
     *,
@@ -57,29 +97,17 @@ def swing_breakout_signal(
 ) -> Optional[SwingSignal]:
     if df.empty or len(df) < lookback + 2:
         return None
-    df = df.copy()
-    df["atr"] = atr(df, 14)
-
-    recent = df.iloc[-(lookback + 1):-1]
-    last = df.iloc[-1]
-    high_break = float(last["close"]) > float(recent["high"].max())
-    low_break = float(last["close"]) < float(recent["low"].min())
-
-    if not high_break and not low_break:
-        return None
-
-    direction = "BUY" if high_break else "SELL"
-    entry = float(last["close"])
-    atr_now = float(last["atr"]) if not pd.isna(last["atr"]) else 0.0
-    if atr_now <= 0:
+    last = swing_breakout_series(df, lookback=lookback, atr_mult=atr_mult).iloc[-1]
+    if not last["direction"]:
         return None
-
-    if direction == "BUY":
-        stop = entry - atr_mult * atr_now
-    else:
-        stop = entry + atr_mult * atr_now
-
-    return SwingSignal(symbol="", direction=direction, entry=entry, stop=stop, trail_atr=atr_mult, reason="breakout")
+    return SwingSignal(
+        symbol="",
+        direction=str(last["direction"]),
+        entry=float(last["entry"]),
+        stop=float(last["stop"]),
+        trail_atr=atr_mult,
+        reason="breakout",
+    )
 
 
 def swing_pullback_signal(
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, time, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
 
 import zoneinfo
 
 
 IST = zoneinfo.ZoneInfo("Asia/Kolkata")
 
+# Regular NSE cash-market session (IST)
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+
 
 @dataclass(frozen=True)
 class SessionWindow:
@@ -29,3 +33,20 @@ def ist_date_str(dt: datetime) -> str:
 def parse_hhmm(s: str) -> time:
     hh, mm = s.split(":")
     return time(hour=int(hh), minute=int(mm))
+
+
+def session_grid(d: date, resolution_min: int = 5) -> list[int]:
+    """Expected bar-open epochs (UTC seconds) for a regular NSE session on `d`.
+
+    FYERS stamps intraday candles with the bar open time, so a full 5m day is
+    09:15, 09:20, ... 15:25 IST (75 bars).
+    """
+    start = datetime.combine(d, SESSION_OPEN).replace(tzinfo=IST)
+    end = datetime.combine(d, SESSION_CLOSE).replace(tzinfo=IST)
+    step = timedelta(minutes=resolution_min)
+    out = []
+    cur = start
+    while cur < end:
+        out.append(int(cur.timestamp()))
+        cur += step
+    return out
@@ -0,0 +1,229 @@
+"""Array kernels shared by the trade simulators.
+
+They replace the per-bar `iterrows()` scans with boolean masks over float64
+arrays. Every comparison is the same one the loops made; the indicator inputs
+(ATR, rolling means) equal the pandas ones up to float rounding, and with a
+refiner an exit can be settled from 1m bars instead.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import epoch_seconds
+
+
+def first_true(mask: np.ndarray) -> int:
+    """Index of the first True in a 1D mask, -1 if there is none."""
+    if mask.size == 0:
+        return -1
+    i = int(np.argmax(mask))
+    return i if mask[i] else -1
+
+
+def first_true_rows(mask: np.ndarray) -> np.ndarray:
+    """Index of the first True in each row of a 2D mask, -1 where a row has none."""
+    return np.where(mask.any(axis=-1), np.argmax(mask, axis=-1), -1)
+
+
+def _arr(df: pd.DataFrame, col: str) -> np.ndarray:
+    return df[col].to_numpy(dtype=np.float64)
+
+
+def orb_entry_mask(
+    close: np.ndarray,
+    volume: np.ndarray,
+    vol_avg: np.ndarray,
+    atr: np.ndarray,
+    *,
+    or_high: float,
+    or_low: float,
+    direction: str,
+    vol_mult: float,
+) -> np.ndarray:
+    """Bars that trigger an ORB entry: close beyond the OR side with volume
+    confirmation, on bars where vol_avg and ATR are formed."""
+    formed = ~np.isnan(vol_avg) & ~np.isnan(atr)
+    cond = close > or_high if direction == "BUY" else close < or_low
+    return formed & cond & (volume >= vol_mult * vol_avg)
+
+
+EXIT_REASONS = ("stop_hit", "target_hit", "time_exit")
+
+
+def _first_index_2d(mask: np.ndarray) -> np.ndarray:
+    # first True per row; n_bars when a row has none
+    return np.where(mask.any(axis=-1), np.argmax(mask, axis=-1), mask.shape[-1])
+
+
+def first_touch(high: np.ndarray, low: np.ndarray, *, direction: str, stop: float, target: float) -> tuple[int, str]:
+    """Bar index and reason of the first stop/target touch, (-1, "time_exit") if none.
+
+    A bar touching both levels counts as a stop (stop is checked first).
+    """
+    if direction == "BUY":
+        stop_i = first_true(low <= stop)
+        tgt_i = first_true(high >= target)
+    else:
+        stop_i = first_true(high >= stop)
+        tgt_i = first_true(low <= target)
+    if stop_i >= 0 and (tgt_i < 0 or stop_i <= tgt_i):
+        return stop_i, "stop_hit"
+    if tgt_i >= 0:
+        return tgt_i, "target_hit"
+    return -1, "time_exit"
+
+
+def bar_seconds(ts: np.ndarray, default: int = 300) -> int:
+    """Bar length of a series of bar-open epochs (smallest step; gaps are multiples)."""
+    return int(np.diff(ts).min()) if len(ts) > 1 else default
+
+
+def touches_both(high: float, low: float, *, direction: str, stop: float, target: float) -> bool:
+    if direction == "BUY":
+        return low <= stop and high >= target
+    return high >= stop and low <= target
+
+
+class IntrabarRefiner:
+    """Orders stop vs target inside a bar that touched both, from its 1m bars.
+
+    `load` returns the day's 1m bars as (ts, high, low) arrays or None; it is
+    called once, on the first ambiguous bar, so trades without one never pay
+    for the 1m data.
+    """
+
+    def __init__(self, load: Callable[[], Optional[tuple[np.ndarray, np.ndarray, np.ndarray]]]):
+        self._load = load
+        self._bars = None
+        self._loaded = False
+
+    @classmethod
+    def from_fetch(cls, symbol: str, d, fetch_fn: Callable[..., pd.DataFrame]) -> "IntrabarRefiner":
+        """Use a module's fetch_intraday(symbol, d, resolution); 1m bars are cached by data_cache."""
+
+        def load():
+            df = fetch_fn(symbol, d, "1")
+            if df is None or df.empty:
+                return None
+            return epoch_seconds(df.index), _arr(df, "high"), _arr(df, "low")
+
+        return cls(load)
+
+    def minute_bars(self) -> Optional[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        if not self._loaded:
+            self._bars = self._load()
+            self._loaded = True
+        return self._bars
+
+    def settle(self, bar_start: int, bar_end: int, *, direction: str, stop: float, target: float) -> str:
+        """"stop_hit" or "target_hit" for the bar [bar_start, bar_end).
+
+        The first 1m touch wins; a 1m bar touching both, or missing 1m data,
+        keeps the conservative stop.
+        """
+        bars = self.minute_bars()
+        if bars is None:
+            return "stop_hit"
+        ts, high, low = bars
+        lo, hi = np.searchsorted(ts, [bar_start, bar_end], side="left")
+        i, reason = first_touch(high[lo:hi], low[lo:hi], direction=direction, stop=stop, target=target)
+        return reason if i >= 0 else "stop_hit"
+
+
+def refine_stop_exit(
+    refiner: Optional[IntrabarRefiner],
+    ts: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    i: int,
+    reason: str,
+    *,
+    entry_i: int,
+    direction: str,
+    stop: float,
+    target: float,
+) -> str:
+    """Exit reason at bar i after intrabar refinement (only an ambiguous stop changes).
+
+    The entry bar (i == entry_i) keeps the stop: the fill is at its close, so
+    its 1m bars all come before the position exists.
+    """
+    if refiner is None or reason != "stop_hit" or i == entry_i:
+        return reason
+    if not touches_both(high[i], low[i], direction=direction, stop=stop, target=target):
+        return reason
+    start = int(ts[i])
+    return refiner.settle(start, start + bar_seconds(ts), direction=direction, stop=stop, target=target)
+
+
+def resolve_exit(
+    bars: pd.DataFrame,
+    *,
+    direction: str,
+    stop: float,
+    target: float,
+    refiner: Optional[IntrabarRefiner] = None,
+) -> tuple[int, float, str]:
+    """First-touch exit over `bars` (entry bar first): (position, raw price, reason).
+
+    With no touch the trade exits at the last bar's close ("time_exit"). With a
+    refiner, a later bar touching both levels is settled from its 1m bars.
+    """
+    high, low = _arr(bars, "high"), _arr(bars, "low")
+    i, reason = first_touch(high, low, direction=direction, stop=stop, target=target)
+    if refiner is not None:
+        reason = refine_stop_exit(refiner, epoch_seconds(bars.index), high, low, i, reason, entry_i=0, direction=direction, stop=stop, target=target)
+    if reason == "stop_hit":
+        return i, stop, reason
+    if reason == "target_hit":
+        return i, target, reason
+    last = len(bars) - 1
+    return last, float(bars["close"].iloc[last]) if last >= 0 else float("nan"), reason
+
+
+def resolve_exits(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    *,
+    start: np.ndarray,
+    end: np.ndarray,
+    is_long: np.ndarray,
+    stop: np.ndarray,
+    target: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Batch version of `resolve_exit` for many trades at once.
+
+    Prices are (bars,) shared by every trade or (trades, bars). Trade k lives on
+    bars start[k] .. end[k]-1. Returns exit bar index, raw exit price and a code
+    into EXIT_REASONS per trade.
+    """
+    high = np.atleast_2d(np.asarray(high, dtype=np.float64))
+    low = np.atleast_2d(np.asarray(low, dtype=np.float64))
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    start = np.asarray(start, dtype=np.int64)[:, None]
+    end = np.asarray(end, dtype=np.int64)[:, None]
+    is_long = np.asarray(is_long, dtype=bool)[:, None]
+    stop = np.asarray(stop, dtype=np.float64)[:, None]
+    target = np.asarray(target, dtype=np.float64)[:, None]
+
+    pos = np.arange(high.shape[-1])
+    live = (pos >= start) & (pos < end)
+    stop_hit = live & np.where(is_long, low <= stop, high >= stop)
+    tgt_hit = live & np.where(is_long, high >= target, low <= target)
+    stop_i = _first_index_2d(stop_hit)
+    tgt_i = _first_index_2d(tgt_hit)
+
+    n_bars = high.shape[-1]
+    last = end[:, 0] - 1
+    by_stop = (stop_i < n_bars) & (stop_i <= tgt_i)
+    by_tgt = ~by_stop & (tgt_i < n_bars)
+    idx = np.where(by_stop, stop_i, np.where(by_tgt, tgt_i, last))
+    rows = np.arange(len(idx)) if close.shape[0] > 1 else np.zeros(len(idx), dtype=np.int64)
+    price = np.where(by_stop, stop[:, 0], np.where(by_tgt, target[:, 0], close[rows, np.maximum(last, 0)]))
+    reason = np.where(by_stop, 0, np.where(by_tgt, 1, 2))
+    return idx, price, reason
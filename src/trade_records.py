@@ -0,0 +1,94 @@
+"""Compact trade records for simulation and selection.
+
+A day's candidate trades live in one NumPy structured array (TRADE_DTYPE):
+epoch-int bar-open timestamps, small-int codes for the categorical fields and
+the symbol as bytes, about 120 bytes a trade. Sorting and slicing work on the
+int columns; IST strings and per-trade dicts are only built by `report_rows`
+when a day log is written.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+
+from orb_engine import ist_str
+from trade_kernels import EXIT_REASONS
+
+STRATEGIES = ("ORB", "MEAN_REVERSION")
+DIRECTIONS = ("BUY", "SELL")
+REGIMES = ("trend", "range")
+
+TRADE_DTYPE = np.dtype(
+    [
+        ("symbol", "S32"),
+        ("strategy", "u1"),
+        ("direction", "u1"),
+        ("regime", "u1"),
+        ("reason", "u1"),
+        ("entry_ts", "i8"),
+        ("exit_ts", "i8"),
+        ("entry", "f8"),
+        ("stop", "f8"),
+        ("target", "f8"),
+        ("qty", "i8"),
+        ("exit_price", "f8"),
+        ("pnl_inr", "f8"),
+        ("outcome_r", "f8"),
+        ("score", "f8"),  # approval score at entry (grades the candidate)
+    ]
+)
+
+
+def trade_row(symbol: str, strategy: str, regime: str, tr) -> tuple:
+    """One TRADE_DTYPE row from a simulator trade (ORBTrade / MRTrade: epoch entry_ts/exit_ts, score)."""
+    return (
+        symbol.encode(),
+        STRATEGIES.index(strategy),
+        DIRECTIONS.index(tr.direction),
+        REGIMES.index(regime),
+        EXIT_REASONS.index(tr.reason),
+        tr.entry_ts,
+        tr.exit_ts,
+        tr.entry,
+        tr.stop,
+        tr.target,
+        tr.qty,
+        tr.exit_price,
+        tr.pnl_inr,
+        tr.outcome_r,
+        tr.score,
+    )
+
+
+def trade_records(rows: Iterable[tuple]) -> np.ndarray:
+    return np.array(list(rows), dtype=TRADE_DTYPE)
+
+
+def by_entry_time(rec: np.ndarray) -> np.ndarray:
+    """Records in entry order; ties keep their input order."""
+    return rec[np.argsort(rec["entry_ts"], kind="stable")]
+
+
+def report_rows(rec: np.ndarray, **notes) -> list[dict]:
+    """Day-log dicts (IST time strings); `notes` are added to every trade's notes."""
+    return [
+        {
+            "symbol": r["symbol"].decode(),
+            "strategy": STRATEGIES[r["strategy"]],
+            "direction": DIRECTIONS[r["direction"]],
+            "entry_ts_ist": ist_str(r["entry_ts"]),
+            "entry": float(r["entry"]),
+            "stop": float(r["stop"]),
+            "target": float(r["target"]),
+            "qty": int(r["qty"]),
+            "exit_ts_ist": ist_str(r["exit_ts"]),
+            "exit_price": float(r["exit_price"]),
+            "pnl_inr": float(r["pnl_inr"]),
+            "outcome_r": float(r["outcome_r"]),
+            "reason": EXIT_REASONS[r["reason"]],
+            "notes": {"regime": REGIMES[r["regime"]], **notes},
+        }
+        for r in rec
+    ]
@@ -8,6 +8,7 @@ from typing import Iterable
 
 import zoneinfo
 
+from data_cache import write_text_atomic
 from fyers_client import get_fyers
 from nifty50_symbols import NIFTY50
 
@@ -42,7 +43,8 @@ def load_universe() -> list[str]:
     # build once if missing
     syms = build_valid_universe(NIFTY50)
     CACHE.parent.mkdir(parents=True, exist_ok=True)
-    CACHE.write_text(
+    write_text_atomic(
+        CACHE,
         json.dumps(
             {
                 "generated_at_ist": datetime.now(tz=IST).strftime("%Y-%m-%d %H:%M:%S"),
@@ -57,6 +59,6 @@ def load_universe() -> list[str]:
 if __name__ == "__main__":
     syms = build_valid_universe(NIFTY50)
     CACHE.parent.mkdir(parents=True, exist_ok=True)
-    CACHE.write_text(json.dumps({"generated_at_ist": datetime.now(tz=IST).strftime("%Y-%m-%d %H:%M:%S"), "symbols": syms}, indent=2))
+    write_text_atomic(CACHE, json.dumps({"generated_at_ist": datetime.now(tz=IST).strftime("%Y-%m-%d %H:%M:%S"), "symbols": syms}, indent=2))
     print(f"Valid symbols: {len(syms)}/{len(NIFTY50)}")
     print("Sample:", syms[:10])
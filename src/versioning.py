@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import hashlib
+import json
 from pathlib import Path
+from typing import Optional
 
 BASE = Path(__file__).resolve().parents[1]
 
@@ -12,10 +14,30 @@ def sha256_file(p: Path) -> str:
     return h.hexdigest()
 
 
-def build_version_stamp() -> dict:
-    cfg = BASE / "config" / "config.paper.json"
+def sha256_files(paths: list[Path], extra: str = "") -> str:
+    """Combined hash of several files (missing ones skipped) plus an optional tag."""
+    parts = [sha256_file(p) for p in paths if p.exists()]
+    if extra:
+        parts.append(extra)
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def config_sha256(cfg: dict) -> str:
+    """Hash of a loaded config (key order does not matter)."""
+    return hashlib.sha256(json.dumps(cfg, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def source_sha256() -> str:
+    """Hash of every module under src/ (a backtest day reaches most of them)."""
+    return sha256_files(sorted((BASE / "src").glob("*.py")))
+
+
+def build_version_stamp(cfg: Optional[dict] = None) -> dict:
+    """Config + key-script hashes; with `cfg` (the config actually loaded) also
+    its hash and the hash of all of src/, for keying cached backtest results."""
+    cfg_path = BASE / "config" / "config.paper.json"
     parts = {
-        "config_sha256": sha256_file(cfg) if cfg.exists() else None,
+        "config_sha256": sha256_file(cfg_path) if cfg_path.exists() else None,
     }
 
     # Hash key scripts so we can track changes even without git
@@ -26,8 +48,9 @@ def build_version_stamp() -> dict:
         BASE / "src" / "nightly_backtest.py",
         BASE / "src" / "lg_run.py",
     ]
-    parts["code_sha256"] = hashlib.sha256(
-        "\n".join([sha256_file(p) for p in key_files if p.exists()]).encode("utf-8")
-    ).hexdigest()
+    parts["code_sha256"] = sha256_files(key_files)
 
+    if cfg is not None:
+        parts["effective_config_sha256"] = config_sha256(cfg)
+        parts["source_sha256"] = source_sha256()
     return parts
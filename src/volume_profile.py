@@ -0,0 +1,198 @@
+"""Average volume by time of day (per symbol, per session slot).
+
+The profile keeps the last N sessions of slot volumes in a ring buffer shaped
+(sessions, symbols, slots) plus running sums, so adding a day is one array
+update and RVOL at any bar is a single lookup: bar volume / mean volume of the
+same slot over the stored sessions. Stored as data/volume_profile/{res}m.npz.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from panel import IntradayPanel, load_cached_panel
+from timeutil import SESSION_CLOSE, SESSION_OPEN, now_ist
+
+BASE = Path(__file__).resolve().parents[1]
+PROFILE_DIR = BASE / "data" / "volume_profile"
+
+IST_OFFSET_S = 5 * 3600 + 30 * 60
+OPEN_S = SESSION_OPEN.hour * 3600 + SESSION_OPEN.minute * 60
+CLOSE_S = SESSION_CLOSE.hour * 3600 + SESSION_CLOSE.minute * 60
+
+
+def slot_index(ts, resolution_min: int = 5):
+    """Session slot of bar-open epoch(s); -1 outside the regular session."""
+    sod = (np.asarray(ts, dtype=np.int64) + IST_OFFSET_S) % 86400
+    slot = (sod - OPEN_S) // (resolution_min * 60)
+    return np.where((sod >= OPEN_S) & (sod < CLOSE_S), slot, -1)
+
+
+@dataclass
+class VolumeProfile:
+    sessions: int = 20
+    resolution_min: int = 5
+    symbols: list[str] = field(default_factory=list)
+    dates: list[str] = field(default_factory=list)  # ring order; "" = empty slot
+    volumes: Optional[np.ndarray] = None  # (sessions, symbols, slots); NaN = no bar
+    head: int = 0  # next ring position to overwrite
+
+    def __post_init__(self):
+        slots = (CLOSE_S - OPEN_S) // (self.resolution_min * 60)
+        if self.volumes is None:
+            self.volumes = np.full((self.sessions, len(self.symbols), slots), np.nan)
+        if not self.dates:
+            self.dates = [""] * self.sessions
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        valid = ~np.isnan(self.volumes)
+        self.total = np.where(valid, self.volumes, 0.0).sum(axis=0)
+        self.count = valid.sum(axis=0)
+
+    @property
+    def latest(self) -> str:
+        return max(self.dates)
+
+    @property
+    def curve(self) -> np.ndarray:
+        """(symbols, slots) mean slot volume; NaN where no session has the bar."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 0, self.total / self.count, np.nan)
+
+    def _rows(self, symbols: list[str]) -> np.ndarray:
+        new = [s for s in symbols if s not in self._index]
+        if new:
+            for s in new:
+                self._index[s] = len(self.symbols)
+                self.symbols.append(s)
+            pad = len(new)
+            self.volumes = np.concatenate([self.volumes, np.full((self.sessions, pad, self.volumes.shape[2]), np.nan)], axis=1)
+            self.total = np.concatenate([self.total, np.zeros((pad, self.total.shape[1]))])
+            self.count = np.concatenate([self.count, np.zeros((pad, self.count.shape[1]), dtype=self.count.dtype)])
+        return np.array([self._index[s] for s in symbols], dtype=np.int64)
+
+    def add_session(self, d: str, symbols: list[str], volume: np.ndarray) -> bool:
+        """Push one session's (symbols, slots) volumes, evicting the oldest one."""
+        if d in self.dates:
+            return False
+        rows = self._rows(symbols)
+        old = self.volumes[self.head]
+        old_valid = ~np.isnan(old)
+        self.total -= np.where(old_valid, old, 0.0)
+        self.count -= old_valid
+
+        new = np.full(old.shape, np.nan)
+        new[rows] = volume
+        new_valid = ~np.isnan(new)
+        self.total += np.where(new_valid, new, 0.0)
+        self.count += new_valid
+        self.volumes[self.head] = new
+        self.dates[self.head] = d
+        self.head = (self.head + 1) % self.sessions
+        return True
+
+    def add_panel(self, panel: IntradayPanel) -> bool:
+        slots = slot_index(panel.ts, self.resolution_min)
+        volume = np.full((len(panel.symbols), self.volumes.shape[2]), np.nan)
+        ok = slots >= 0
+        volume[:, slots[ok]] = panel.volume[:, ok]
+        return self.add_session(panel.d.isoformat(), panel.symbols, volume)
+
+    def rvol(self, symbol: str, ts: int, volume: float) -> Optional[float]:
+        """Bar volume relative to the symbol's average for that slot."""
+        i = self._index.get(symbol)
+        slot = int(slot_index(ts, self.resolution_min))
+        if i is None or slot < 0 or self.count[i, slot] == 0:
+            return None
+        avg = self.total[i, slot] / self.count[i, slot]
+        return float(volume / avg) if avg > 0 else None
+
+    def rvol_panel(self, panel: IntradayPanel) -> np.ndarray:
+        """(symbols, bars) RVOL for a whole panel; NaN where there is no baseline."""
+        rows = np.array([self._index.get(s, -1) for s in panel.symbols], dtype=np.int64)
+        slots = slot_index(panel.ts, self.resolution_min)
+        curve = np.pad(self.curve, ((0, 1), (0, 1)), constant_values=np.nan)  # row/col -1 -> NaN
+        base = curve[rows[:, None], slots[None, :]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(base > 0, panel.volume / base, np.nan)
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        path = path or profile_path(self.resolution_min)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            sessions=self.sessions,
+            resolution_min=self.resolution_min,
+            head=self.head,
+            symbols=np.array(self.symbols, dtype=str),
+            dates=np.array(self.dates, dtype=str),
+            volumes=self.volumes,
+        )
+        tmp.replace(path)
+        return path
+
+
+def profile_path(resolution_min: int = 5) -> Path:
+    return PROFILE_DIR / f"{resolution_min}m.npz"
+
+
+def load_profile(resolution_min: int = 5, *, sessions: int = 20) -> VolumeProfile:
+    """Stored profile, or an empty one if missing, unreadable or a different N."""
+    path = profile_path(resolution_min)
+    try:
+        if path.exists():
+            with np.load(path) as z:
+                if int(z["sessions"]) == sessions:
+                    return VolumeProfile(
+                        sessions=sessions,
+                        resolution_min=int(z["resolution_min"]),
+                        head=int(z["head"]),
+                        symbols=z["symbols"].tolist(),
+                        dates=z["dates"].tolist(),
+                        volumes=z["volumes"],
+                    )
+    except Exception:
+        pass
+    return VolumeProfile(sessions=sessions, resolution_min=resolution_min)
+
+
+def update_profile(profile: VolumeProfile, symbols: Iterable[str], dates: Iterable[date]) -> int:
+    """Add cached sessions newer than the latest stored one; returns how many."""
+    symbols = list(symbols)
+    added = 0
+    for d in sorted(dates):
+        if d.isoformat() <= profile.latest:
+            continue
+        panel = load_cached_panel(symbols, d, str(profile.resolution_min))
+        if not panel.mask.any():
+            continue
+        added += profile.add_panel(panel)
+    return added
+
+
+def main():
+    from trading_days import last_n_trading_days
+    from universe import load_universe
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=20, help="Sessions averaged per slot (ring length)")
+    ap.add_argument("--days", type=int, default=20, help="Trading days to scan for new sessions")
+    args = ap.parse_args()
+
+    profile = load_profile(sessions=args.sessions)
+    # today's session is still forming; it joins the profile after the close
+    dates = [d for d in last_n_trading_days(args.days) if d < now_ist().date()]
+    added = update_profile(profile, load_universe(), dates)
+    path = profile.save()
+    filled = sorted(d for d in profile.dates if d)
+    print(f"Volume profile: +{added} sessions, {len(filled)}/{args.sessions} stored ({filled[:1] + filled[-1:]}) -> {path}")
+
+
+if __name__ == "__main__":
+    main()